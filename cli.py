@@ -0,0 +1,304 @@
+import argparse
+import dataclasses
+import sys
+
+from core import engine, persistence
+from core.client import DaemonClient, default_socket
+from core.engine import ScanConfig
+
+
+def print_group(group, mode: str):
+    """Print one duplicate group, keeper first"""
+    files = group.files if mode == "single" else group.redundant
+    kind = f"directory of {group.files[0]['file_count']} files, " if group.files[0].get('directory') else ""
+    status = group.status
+    if group.similarity is not None:
+        status += f" {group.similarity:.0%}"
+    print(f"[{status}] {kind}{group.files[0]['size']:,} bytes, {len(group.files)} copies")
+    if group.keeper is not None:
+        print(f"  keep #{group.keeper['root'] + 1} {group.keeper['path']}")
+    for file_info in files:
+        prefix = "  copy" if mode == "single" else "  redundant"
+        print(f"{prefix} #{file_info['root'] + 1} {file_info['path']}")
+
+
+def print_groups(groups, mode: str, threshold=None) -> int:
+    """Print duplicate groups and a summary line; returns the group count"""
+    count = 0
+    reclaimable = 0
+    for group in groups:
+        print_group(group, mode)
+        count += 1
+        reclaimable += group.reclaimable
+    kind = f"near-duplicate groups (similarity >= {threshold:.0%})" if threshold else "duplicate groups"
+    print(f"{count} {kind}, {reclaimable:,} bytes reclaimable")
+    return count
+
+
+def get_config(args) -> ScanConfig:
+    return ScanConfig(
+        roots=args.roots,
+        mode=args.mode,
+        recursive=not args.no_subdirs,
+        match_name=not args.no_name,
+        match_size=not args.no_size,
+        match_date=args.date,
+        date_tolerance=args.tolerance,
+        async_scan=args.async_scan,
+        quick=args.quick,
+        memory_limit_mb=args.memory_limit,
+        temp_dir=args.temp_dir,
+        workers=args.workers,
+        compact_master=args.compact_master,
+        time_budget=args.time_budget,
+        byte_budget=args.byte_budget * 1024 * 1024 if args.byte_budget is not None else None,
+        match_directories=args.directories,
+        scan_archives=args.archives,
+        similarity_threshold=args.similar,
+        name_matching=args.names,
+        name_distance=args.name_distance,
+        read_limit_mb=args.max_read,
+        iops_limit=args.max_iops,
+        cpu_share=args.cpu_share,
+        max_load=args.max_load,
+        max_iowait=args.max_iowait,
+        follow_symlinks=args.follow_symlinks,
+        one_file_system=args.one_file_system
+    )
+
+
+def add_config_arguments(parser):
+    parser.add_argument('roots', nargs='+', help="directories, master first")
+    parser.add_argument('--mode', choices=engine.MODES, default='single')
+    parser.add_argument('--no-subdirs', action='store_true', help="do not recurse")
+    parser.add_argument('--follow-symlinks', action='store_true',
+                        help="follow symlinks instead of skipping them")
+    parser.add_argument('--one-file-system', action='store_true',
+                        help="do not descend into other filesystems")
+    parser.add_argument('--no-name', action='store_true', help="do not match names")
+    parser.add_argument('--names', choices=engine.NAME_MODES, default='exact',
+                        help="how names are compared: exactly, normalized (case and "
+                             "copy markers ignored) or fuzzy (within --name-distance edits)")
+    parser.add_argument('--name-distance', type=int, default=engine.DEFAULT_NAME_DISTANCE,
+                        help="edit distance allowed between fuzzy names")
+    parser.add_argument('--no-size', action='store_true', help="do not match sizes")
+    parser.add_argument('--date', action='store_true', help="match modification dates")
+    parser.add_argument('--tolerance', type=float, default=engine.DEFAULT_DATE_TOLERANCE,
+                        help="date tolerance in seconds")
+    parser.add_argument('--async', dest='async_scan', action='store_true',
+                        help="scan with many concurrent operations (network mounts)")
+    parser.add_argument('--quick', action='store_true', help="sample large files")
+    parser.add_argument('--memory-limit', type=int, metavar='MB',
+                        help="bound matching memory by spilling sorted runs to disk")
+    parser.add_argument('--temp-dir', help="directory for spilled runs")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes for matching size buckets (0 = one per CPU)")
+    parser.add_argument('--compact-master', action='store_true',
+                        help="master mode: index the master side on disk behind a Bloom filter")
+    parser.add_argument('--directories', action='store_true',
+                        help="report identical directory trees as single entries")
+    parser.add_argument('--archives', action='store_true',
+                        help="match the members of zip and tar archives too")
+    parser.add_argument('--similar', type=float, nargs='?', metavar='THRESHOLD',
+                        const=engine.similarity.DEFAULT_THRESHOLD,
+                        help="find near-duplicates instead (default threshold %(const)s)")
+    parser.add_argument('--max-read', type=float, metavar='MB/S',
+                        help="limit the read bandwidth of the scan")
+    parser.add_argument('--max-iops', type=float, metavar='OPS',
+                        help="limit reads and directory operations per second")
+    parser.add_argument('--cpu-share', type=float, metavar='FRACTION',
+                        help="fraction of a CPU each scan thread may use")
+    parser.add_argument('--max-load', type=float, metavar='LOAD',
+                        help="back off while the load average per CPU is above this")
+    parser.add_argument('--max-iowait', type=float, metavar='FRACTION',
+                        help="back off while this fraction of CPU time is I/O wait")
+    parser.add_argument('--time-budget', type=float, metavar='SECONDS',
+                        help="stop after this time, biggest potential savings first")
+    parser.add_argument('--byte-budget', type=int, metavar='MB',
+                        help="read at most this much data, biggest potential savings first")
+
+
+def cmd_scan(args) -> int:
+    if args.daemon:
+        result = DaemonClient(args.daemon).scan(get_config(args))
+    else:
+        result = engine.search(get_config(args))
+    if args.verify:
+        engine.verify_groups(result)
+    print_groups(result.groups, result.config.mode, result.config.similarity_threshold)
+    if result.budget_exhausted:
+        print("Budget exhausted: results are partial")
+    if args.save:
+        persistence.save_result(result, args.save)
+        print(f"Saved to {args.save}")
+    return 0
+
+
+def cmd_show(args) -> int:
+    result = persistence.load_result(args.file)
+    print(f"Scan of {', '.join(result.config.roots)} started {result.started:%Y-%m-%d %H:%M:%S}")
+    groups = result.groups if args.as_saved else persistence.iter_valid_groups(result)
+    print_groups(groups, result.config.mode, result.config.similarity_threshold)
+    return 0
+
+
+def cmd_shard_scan(args) -> int:
+    from core.shards import scan_shard
+    index = scan_shard(get_config(args))
+    persistence.save_index(index, args.output)
+    print(f"{len(index.files)} files of {', '.join(index.labels)} indexed in {args.output}")
+    return 0
+
+
+def cmd_merge(args) -> int:
+    from core.shards import merge_indexes
+    indexes = [persistence.load_index(path) for path in args.indexes]
+    criteria = ScanConfig(roots=[], mode=args.mode, match_name=not args.no_name,
+                          match_size=not args.no_size, match_date=args.date,
+                          date_tolerance=args.tolerance)
+    result = merge_indexes(indexes, criteria)
+    for root_index, label in enumerate(result.config.roots):
+        print(f"#{root_index + 1} {label}")
+    print_groups(result.groups, result.config.mode)
+    if result.cancelled:
+        print("Some shards were cancelled: results are partial")
+    if args.save:
+        persistence.save_result(result, args.save)
+        print(f"Saved to {args.save}")
+    return 0
+
+
+def cmd_contains(args) -> int:
+    from core.containment import check_containment
+    config = dataclasses.replace(get_config(args), mode='master')
+    report = check_containment(config, args.spot_check, args.seed)
+    for file_info in report.missing:
+        print(f"missing {file_info['path']}")
+    for file_info, _, reason in report.differing:
+        print(f"differs ({reason}) {file_info['path']}")
+    print(f"{len(report.present)} present, {len(report.missing)} missing, "
+          f"{len(report.differing)} differing; {report.hashed} files hashed, "
+          f"{report.spot_checked} spot-checked")
+    return 0 if report.contained else 2
+
+
+def cmd_consolidate(args) -> int:
+    from core.consolidate import consolidate
+    result = persistence.load_result(args.file)
+    groups = list(persistence.iter_valid_groups(result))
+    # Without a keeper, the first copy of each group is kept
+    selected = [f for group in groups
+                for f in (group.redundant if group.keeper is not None else group.files[1:])]
+    linked, refused = consolidate(selected, groups, args.journal, args.method)
+    for file_info, reason in refused:
+        print(f"Kept ({reason}) {file_info['path']}")
+    print(f"{len(linked)} files replaced by {args.method}s, "
+          f"{sum(f['size'] for f in linked):,} bytes reclaimed; journal in {args.journal}")
+    return 0
+
+
+def cmd_rollback(args) -> int:
+    from core.consolidate import rollback
+    restored, failed = rollback(args.journal)
+    for path, error in failed:
+        print(f"Error processing {path}: {error}")
+    print(f"{len(restored)} files restored")
+    return 1 if failed else 0
+
+
+def cmd_daemon(args) -> int:
+    from core.daemon import Daemon
+    print(f"Listening on {args.socket}")
+    Daemon(args.socket, watch=args.watch).serve_forever()
+    return 0
+
+
+def cmd_revalidate(args) -> int:
+    listed = DaemonClient(args.daemon).revalidate(args.paths or None)
+    print(f"{listed} files listed")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Find duplicate files")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan = commands.add_parser('scan', help="search for duplicates")
+    add_config_arguments(scan)
+    scan.add_argument('--verify', action='store_true',
+                      help="confirm quick-mode groups with full hashes")
+    scan.add_argument('--save', metavar='FILE', help="save the results")
+    scan.add_argument('--daemon', metavar='SOCKET', default=default_socket(),
+                      help="search in a running daemon (default: $DUPLICATE_FINDER_DAEMON)")
+    scan.set_defaults(func=cmd_scan)
+
+    show = commands.add_parser('show', help="show saved results")
+    show.add_argument('file')
+    show.add_argument('--as-saved', action='store_true',
+                      help="do not check the files again, e.g. for merged shards of other hosts")
+    show.set_defaults(func=cmd_show)
+
+    shard = commands.add_parser('shard-scan', help="hash a shard into a partial index")
+    add_config_arguments(shard)
+    shard.add_argument('--output', metavar='FILE', required=True,
+                       help="partial index to write (*.shard.json.gz)")
+    shard.set_defaults(func=cmd_shard_scan)
+
+    merge = commands.add_parser('merge', help="combine partial indexes into one report")
+    merge.add_argument('indexes', nargs='+', help="partial indexes, highest priority first")
+    merge.add_argument('--mode', choices=engine.MODES, default='multi')
+    merge.add_argument('--no-name', action='store_true', help="do not match names")
+    merge.add_argument('--no-size', action='store_true', help="do not match sizes")
+    merge.add_argument('--date', action='store_true', help="match modification dates")
+    merge.add_argument('--tolerance', type=float, default=engine.DEFAULT_DATE_TOLERANCE,
+                       help="date tolerance in seconds")
+    merge.add_argument('--save', metavar='FILE', help="save the merged report")
+    merge.set_defaults(func=cmd_merge)
+
+    contains = commands.add_parser('contains',
+                                   help="check that a backup holds every file (exit 2 if not)")
+    add_config_arguments(contains)
+    contains.add_argument('--spot-check', type=float, default=0.01, metavar='FRACTION',
+                          help="fraction of files matched by size and date to hash anyway")
+    contains.add_argument('--seed', type=int, help="seed of the spot-check sample")
+    contains.set_defaults(func=cmd_contains)
+
+    link = commands.add_parser('consolidate',
+                               help="replace the redundant copies of saved results with links")
+    link.add_argument('file', help="results saved by scan --save")
+    link.add_argument('--method', choices=('hardlink', 'reflink'), default='hardlink',
+                      help="reflinks need a filesystem such as Btrfs or XFS")
+    link.add_argument('--journal', metavar='FILE', required=True,
+                      help="journal of the replacements, for rollback")
+    link.set_defaults(func=cmd_consolidate)
+
+    undo = commands.add_parser('rollback', help="undo a consolidation from its journal")
+    undo.add_argument('journal')
+    undo.set_defaults(func=cmd_rollback)
+
+    daemon = commands.add_parser('daemon', help="serve searches with a warm index")
+    daemon.add_argument('socket', help="Unix-domain socket to listen on")
+    daemon.add_argument('--watch', action='store_true',
+                        help="watch the indexed directories and keep them up to date")
+    daemon.set_defaults(func=cmd_daemon)
+
+    revalidate = commands.add_parser('revalidate', help="make a daemon walk changed directories")
+    revalidate.add_argument('paths', nargs='*', help="changed directories (default: all roots)")
+    revalidate.add_argument('--daemon', metavar='SOCKET', default=default_socket(),
+                            required=default_socket() is None,
+                            help="daemon socket (default: $DUPLICATE_FINDER_DAEMON)")
+    revalidate.set_defaults(func=cmd_revalidate)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import tarfile
+import zipfile
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+MEMBER_SEPARATOR = '!/'
+CHUNK_SIZE = 1024 * 1024
+ARCHIVE_ERRORS = (OSError, EOFError, RuntimeError, zipfile.BadZipFile, tarfile.TarError)
+
+
+def is_archive(path: str) -> bool:
+    """Whether a file is a zip or tar archive, judging by its name."""
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _member_info(archive: Dict, member: str, size: int, date: datetime,
+                 archive_mtime: float) -> Dict:
+    return {
+        'name': member.rsplit('/', 1)[-1],
+        'path': archive['path'] + MEMBER_SEPARATOR + member,
+        'size': size,
+        'date': date,
+        'archive': archive['path'],
+        'member': member,
+        'archive_mtime': archive_mtime,
+    }
+
+
+def list_members(archive: Dict) -> List[Dict]:
+    """
+    List the regular files inside an archive, without extracting them.
+
+    Members look like file information: their 'path' is the archive path,
+    MEMBER_SEPARATOR and the member name, and they also carry 'archive',
+    'member' and the archive's 'archive_mtime'. Zip members carry their
+    stored 'crc' as well. A name stored several times is listed once, as
+    its last copy, which is the one extraction yields. A member whose
+    stored date is invalid (e.g. a zeroed zip timestamp) gets the date of
+    the archive.
+
+    Args:
+        archive (Dict): File information of the archive.
+
+    Returns:
+        List[Dict]: Information about every member.
+
+    Raises:
+        OSError: If the archive cannot be read.
+        zipfile.BadZipFile, tarfile.TarError: If the archive is corrupt.
+    """
+    members = {}
+    archive_mtime = os.stat(archive['path']).st_mtime
+
+    def member_date(make_date) -> datetime:
+        try:
+            return make_date()
+        except (ValueError, OverflowError, OSError):
+            return datetime.fromtimestamp(archive_mtime)
+
+    if archive['path'].lower().endswith('.zip'):
+        with zipfile.ZipFile(archive['path']) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                member = _member_info(archive, info.filename, info.file_size,
+                                      member_date(lambda: datetime(*info.date_time)),
+                                      archive_mtime)
+                member['crc'] = info.CRC
+                members[info.filename] = member
+    else:
+        # Stream mode reads compressed tars in one pass, without seeking
+        with tarfile.open(archive['path'], 'r|*') as tf:
+            for info in tf:
+                if info.isfile():
+                    members[info.name] = _member_info(
+                        archive, info.name, info.size,
+                        member_date(lambda: datetime.fromtimestamp(info.mtime)),
+                        archive_mtime)
+    return list(members.values())
+
+
+def _hash_stream(stream) -> str:
+    hasher = hashlib.md5()
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return hasher.hexdigest()
+        hasher.update(chunk)
+
+
+def hash_members(members: List[Dict],
+                 progress: Optional[Callable[[str, str, int], None]] = None,
+                 cancelled: Optional[Callable[[], bool]] = None) -> List[Dict]:
+    """
+    Add the content hash to archive members, decompressing in memory.
+
+    The hash is the MD5 of the uncompressed content, so members match
+    regular files with the same content. Each archive is opened once; tar
+    archives are read sequentially in a single pass. A name stored several
+    times gets the hash of its last copy, as in list_members.
+
+    Args:
+        members (List[Dict]): Members listed by list_members.
+        progress (Optional[Callable[[str, str, int], None]]): Called with
+            archive, member and the number of members hashed so far.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+
+    Returns:
+        List[Dict]: The members that could be hashed.
+    """
+    cancelled = cancelled or (lambda: False)
+    by_archive = {}
+    for member in members:
+        by_archive.setdefault(member['archive'], {})[member['member']] = member
+    hashed = []
+    for archive, wanted in by_archive.items():
+        if cancelled():
+            break
+        try:
+            if archive.lower().endswith('.zip'):
+                with zipfile.ZipFile(archive) as zf:
+                    for name, member in wanted.items():
+                        if cancelled():
+                            break
+                        if progress:
+                            progress(archive, name, len(hashed))
+                        with zf.open(name) as stream:
+                            member['hash'] = _hash_stream(stream)
+                        hashed.append(member)
+            else:
+                done = set()
+                with tarfile.open(archive, 'r|*') as tf:
+                    for info in tf:
+                        if cancelled():
+                            break
+                        member = wanted.get(info.name)
+                        if member is None or not info.isfile():
+                            continue
+                        if progress:
+                            progress(archive, info.name, len(hashed))
+                        # A later copy of the same name replaces the hash
+                        member['hash'] = _hash_stream(tf.extractfile(info))
+                        if info.name not in done:
+                            done.add(info.name)
+                            hashed.append(member)
+        except ARCHIVE_ERRORS as e:
+            print(f"Error processing {archive}: {str(e)}")
+    return hashed
+
+
+def hash_member(member: Dict) -> str:
+    """
+    Hash the current content of one archive member.
+
+    Raises:
+        OSError: If the archive cannot be read or the member is gone.
+    """
+    hashed = hash_members([dict(member)])
+    if not hashed:
+        raise OSError(f"Cannot read {member['path']}")
+    return hashed[0]['hash']
+
+
+def split_by_crc(bucket: List[Dict]) -> List[List[Dict]]:
+    """
+    Split a size bucket by the CRC stored in zip archives.
+
+    Only possible when every file of the bucket is a zip member, since
+    the CRC of any other file is unknown without reading it.
+
+    Args:
+        bucket (List[Dict]): Files of the same size.
+
+    Returns:
+        List[List[Dict]]: Sub-buckets that may hold duplicates.
+    """
+    if not all('crc' in f for f in bucket):
+        return [bucket]
+    by_crc = {}
+    for f in bucket:
+        by_crc.setdefault(f['crc'], []).append(f)
+    return [files for files in by_crc.values() if len(files) > 1]
+
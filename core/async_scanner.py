@@ -0,0 +1,264 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .hashing import get_file_hash, get_sample_hash
+from .scanner import get_file_info
+
+DEFAULT_CONCURRENCY = 64
+
+
+class LocalFileSystem:
+    """
+    Blocking filesystem operations used by the asynchronous scanner.
+
+    Every method is executed on a worker thread, so a stand-in with
+    artificial latency can be passed to the scanner to emulate a
+    network mount.
+
+    Args:
+        chunk_size (Optional[int]): Read size for hashing; chosen per file
+            when None.
+        use_mmap (bool): Whether large files may be memory-mapped.
+        throttle (Optional[Throttle]): I/O and CPU limits applied to every
+            operation.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, use_mmap: bool = True,
+                 throttle=None):
+        self.chunk_size = chunk_size
+        self.use_mmap = use_mmap
+        self.throttle = throttle
+
+    def list_dir(self, directory: str, follow_symlinks: bool = False
+                 ) -> List[Tuple[str, bool, bool, Optional[Tuple[int, int]]]]:
+        """
+        List a directory.
+
+        Args:
+            directory (str): Directory to list.
+            follow_symlinks (bool): Whether symlinks count as what they
+                point to; otherwise they are neither files nor directories.
+
+        Returns:
+            List[Tuple[str, bool, bool, Optional[Tuple[int, int]]]]: (path,
+                is_dir, is_file, (st_dev, st_ino) of directories) per entry.
+        """
+        if self.throttle:
+            self.throttle.operation()
+        listing = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                    identity = None
+                    if is_dir:
+                        stat = entry.stat(follow_symlinks=follow_symlinks)
+                        identity = (stat.st_dev, stat.st_ino)
+                    listing.append((entry.path, is_dir,
+                                    entry.is_file(follow_symlinks=follow_symlinks), identity))
+                except OSError as e:
+                    print(f"Error processing {entry.path}: {str(e)}")
+        return listing
+
+    def file_info(self, filepath: str) -> Dict:
+        """
+        Get the same file information as core.scanner.get_file_info.
+
+        Args:
+            filepath (str): Path to the file.
+
+        Returns:
+            Dict: name, path, size and date of the file.
+        """
+        if self.throttle:
+            self.throttle.operation()
+        return get_file_info(filepath, with_hash=False, resolve=False)
+
+    def file_hash(self, filepath: str) -> str:
+        """
+        Hash the contents of a file.
+
+        Args:
+            filepath (str): Path to the file.
+
+        Returns:
+            str: Hexadecimal MD5 digest.
+        """
+        return get_file_hash(filepath, self.chunk_size, self.use_mmap, self.throttle)
+
+    def sample_hash(self, filepath: str) -> str:
+        """
+        Hash the size and evenly spaced blocks of a file.
+
+        Args:
+            filepath (str): Path to the file.
+
+        Returns:
+            str: Hexadecimal MD5 digest of the samples.
+        """
+        return get_sample_hash(filepath, throttle=self.throttle)
+
+
+def _run_bounded(concurrency: int, coroutine_factory):
+    """Run a coroutine with a dedicated pool of `concurrency` threads."""
+    async def main():
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            loop.set_default_executor(executor)
+            return await coroutine_factory(loop, asyncio.Semaphore(concurrency))
+
+    return asyncio.run(main())
+
+
+def scan_directory(directory: str, recursive: bool = True,
+                   concurrency: int = DEFAULT_CONCURRENCY,
+                   fs: Optional[LocalFileSystem] = None,
+                   cancelled: Optional[Callable[[], bool]] = None,
+                   follow_symlinks: bool = False,
+                   one_file_system: bool = False) -> List[Dict]:
+    """
+    Scan a directory with many filesystem operations in flight at once.
+
+    Directory listing and stat are offloaded to a thread pool and bounded
+    by a semaphore, so high-latency mounts (SMB/NFS) spend their
+    round-trips in parallel instead of one after another. As in
+    core.scanner.iter_directory, files reached by several paths are kept
+    once, under the first path compared component by component, whatever
+    order the listings complete in. A directory reached again by an
+    earlier path is walked again under it, so the same path is kept; any
+    other repeat, including every cycle, is skipped.
+
+    Args:
+        directory (str): Directory to scan.
+        recursive (bool): Whether to descend into subdirectories.
+        concurrency (int): Maximum number of operations in flight.
+        fs (Optional[LocalFileSystem]): Filesystem implementation to use.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+        follow_symlinks (bool): Whether symlinks are followed.
+        one_file_system (bool): Whether to stay on the directory's filesystem.
+
+    Returns:
+        List[Dict]: File information dictionaries sorted by path, with the
+            same contents as core.scanner.scan_directory produces.
+
+    Raises:
+        OSError: If the top-level directory cannot be listed.
+    """
+    fs = fs or LocalFileSystem()
+    cancelled = cancelled or (lambda: False)
+    root = str(Path(directory).resolve())
+    root_stat = os.stat(root)
+    # (st_dev, st_ino) -> components of the earliest path walked
+    visited = {(root_stat.st_dev, root_stat.st_ino): root.split(os.sep)}
+    files = []
+
+    async def scan(loop, semaphore):
+        async def run(func, *args):
+            async with semaphore:
+                return await loop.run_in_executor(None, func, *args)
+
+        async def process_file(filepath: str):
+            if cancelled():
+                return
+            try:
+                files.append(await run(fs.file_info, filepath))
+            except (OSError, PermissionError) as e:
+                print(f"Error processing {filepath}: {str(e)}")
+
+        async def process_dir(path: str, entries=None):
+            if cancelled():
+                return
+            if entries is None:
+                try:
+                    entries = await run(fs.list_dir, path, follow_symlinks)
+                except (OSError, PermissionError) as e:
+                    print(f"Error accessing directory {path}: {str(e)}")
+                    return
+            tasks = []
+            for entry_path, is_dir, is_file, identity in entries:
+                if is_dir:
+                    # Checked and marked in one step, so concurrent listings
+                    # cannot both descend into the same directory
+                    components = entry_path.split(os.sep)
+                    known = visited.get(identity)
+                    if (not recursive or (known is not None and known <= components) or
+                            (one_file_system and identity[0] != root_stat.st_dev)):
+                        continue
+                    visited[identity] = components
+                    tasks.append(process_dir(entry_path))
+                elif is_file:
+                    tasks.append(process_file(entry_path))
+            await asyncio.gather(*tasks)
+
+        # Errors on the top-level directory are left to the caller
+        await process_dir(root, await run(fs.list_dir, root, follow_symlinks))
+
+    _run_bounded(concurrency, scan)
+    files.sort(key=lambda f: f['path'].split(os.sep))
+    unique = []
+    seen = set()
+    for file_info in files:
+        if file_info['inode'] not in seen:
+            seen.add(file_info['inode'])
+            unique.append(file_info)
+    return sorted(unique, key=lambda f: f['path'])
+
+
+def hash_files(files: List[Dict],
+               concurrency: int = DEFAULT_CONCURRENCY,
+               fs: Optional[LocalFileSystem] = None,
+               progress: Optional[Callable[[str, str, int], None]] = None,
+               cancelled: Optional[Callable[[], bool]] = None,
+               quick_min_size: Optional[int] = None) -> List[Dict]:
+    """
+    Add the content hash to each file, with bounded concurrency.
+
+    Files of quick_min_size bytes or more get a sampled hash instead and
+    are flagged 'sampled'.
+
+    Args:
+        files (List[Dict]): Files to hash.
+        concurrency (int): Maximum number of files hashed at once.
+        fs (Optional[LocalFileSystem]): Filesystem implementation to use.
+        progress (Optional[Callable[[str, str, int], None]]): Called with
+            folder, filename and the number of files hashed so far.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+        quick_min_size (Optional[int]): Size from which files are only
+            sampled; None hashes every file in full.
+
+    Returns:
+        List[Dict]: The files that could be hashed, in input order.
+    """
+    fs = fs or LocalFileSystem()
+    cancelled = cancelled or (lambda: False)
+    done = []
+
+    async def hash_all(loop, semaphore):
+        async def process_file(file_info: Dict):
+            async with semaphore:
+                if cancelled():
+                    return
+                sampled = quick_min_size is not None and file_info['size'] >= quick_min_size
+                try:
+                    file_info['hash'] = await loop.run_in_executor(
+                        None, fs.sample_hash if sampled else fs.file_hash, file_info['path'])
+                except (OSError, PermissionError) as e:
+                    print(f"Error processing {file_info['path']}: {str(e)}")
+                    return
+            if sampled:
+                file_info['sampled'] = True
+            else:
+                file_info.pop('sampled', None)
+            done.append(file_info)
+            if progress:
+                path = Path(file_info['path'])
+                progress(str(path.parent), path.name, len(done))
+
+        await asyncio.gather(*(process_file(f) for f in files))
+
+    _run_bounded(concurrency, hash_all)
+    hashed = {id(f) for f in done}
+    return [f for f in files if id(f) in hashed]
@@ -0,0 +1,91 @@
+import json
+import os
+import socket
+from dataclasses import asdict, replace
+from typing import Any, Dict, List, Optional
+
+from . import persistence
+from .engine import DuplicateGroup, ScanConfig, SearchResult
+
+SOCKET_ENV = 'DUPLICATE_FINDER_DAEMON'
+
+
+class DaemonError(OSError):
+    """The daemon could not be reached or rejected a request."""
+
+
+def default_socket() -> Optional[str]:
+    """Socket of the daemon to use, from the DUPLICATE_FINDER_DAEMON variable."""
+    return os.environ.get(SOCKET_ENV) or None
+
+
+class DaemonClient:
+    """
+    Thin client of a Daemon listening on a Unix-domain socket.
+
+    Every call opens a connection, sends one request and reads one
+    response, so a client holds no state between calls.
+
+    Args:
+        socket_path (str): Socket the daemon listens on.
+        timeout (Optional[float]): Seconds to wait for a response; None
+            waits as long as a search takes.
+    """
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def request(self, op: str, **params) -> Any:
+        """
+        Send a request and return its result.
+
+        Raises:
+            DaemonError: If the daemon cannot be reached or reports an error.
+        """
+        if not hasattr(socket, 'AF_UNIX'):
+            raise DaemonError("Daemon mode needs Unix-domain sockets")
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(json.dumps(dict(params, op=op)).encode() + b'\n')
+                with sock.makefile('rb') as reader:
+                    line = reader.readline()
+        except OSError as e:
+            raise DaemonError(f"Cannot reach daemon at {self.socket_path}: {e}") from None
+        if not line:
+            raise DaemonError("Daemon closed the connection")
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise DaemonError(response.get('error', "Request failed"))
+        return response['result']
+
+    def ping(self) -> bool:
+        """Check that the daemon answers."""
+        return self.request('ping') == 'pong'
+
+    def scan(self, config: ScanConfig) -> SearchResult:
+        """Run a search in the daemon, with the roots made absolute here since
+        the daemon runs in another directory."""
+        config = replace(config, roots=[os.path.abspath(root) for root in config.roots])
+        return persistence.decode_result(self.request('scan', config=asdict(config)))
+
+    def query(self, path: str) -> List[DuplicateGroup]:
+        """Groups of the daemon's last search that contain a file."""
+        return [persistence.decode_group(group)
+                for group in self.request('query', path=os.path.abspath(path))]
+
+    def revalidate(self, paths: Optional[List[str]] = None) -> int:
+        """Have the daemon walk changed directories (None = every root) again."""
+        if paths is not None:
+            paths = [os.path.abspath(path) for path in paths]
+        return self.request('revalidate', paths=paths)
+
+    def status(self) -> Dict:
+        """Indexed roots and number of cached hashes."""
+        return self.request('status')
+
+    def shutdown(self):
+        """Stop the daemon."""
+        self.request('shutdown')
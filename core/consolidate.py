@@ -0,0 +1,248 @@
+import errno
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .engine import DuplicateGroup
+from .verify import CHANGED, IN_ARCHIVE, MISSING, NO_SURVIVOR, same_content
+
+HARDLINK = 'hardlink'
+REFLINK = 'reflink'
+METHODS = (HARDLINK, REFLINK)
+# _IOW(0x94, 9, int) from linux/fs.h
+FICLONE = 0x40049409
+
+_JOURNAL_KEYS = frozenset(('method', 'source', 'target', 'mode', 'uid', 'gid',
+                           'atime', 'mtime'))
+
+IS_DIRECTORY = "is a directory"
+NOT_IDENTICAL = "is only a near-duplicate"
+ALREADY_LINKED = "already shares its data"
+
+
+def _clone(source: str, target: str):
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported on this platform") from None
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def _temp_path(target: str) -> str:
+    # A new file next to the target, so no existing file is ever reused
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(target)}.",
+                                    suffix='.link.tmp',
+                                    dir=os.path.dirname(target) or '.')
+    os.close(fd)
+    return tmp_path
+
+
+def _make_link(source: str, target: str, method: str) -> str:
+    tmp_path = _temp_path(target)
+    created = True
+    try:
+        if method == HARDLINK:
+            os.remove(tmp_path)
+            created = False
+            os.link(source, tmp_path)
+        else:
+            _clone(source, tmp_path)
+            shutil.copystat(target, tmp_path)
+    except OSError:
+        if created and os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def link_file(source: str, target: str, method: str = HARDLINK):
+    """
+    Replace a file with a hardlink or reflink to an identical file.
+
+    The link is made under a temporary name next to the target and then
+    renamed over it, so the target path always exists. A hardlink shares
+    the source's inode, and so its permissions and dates; a reflink is a
+    separate file sharing the data blocks, which keeps the target's
+    permissions and dates.
+
+    Args:
+        source (str): File to link to.
+        target (str): File to replace.
+        method (str): HARDLINK or REFLINK.
+
+    Raises:
+        ValueError: If the method is unknown.
+        OSError: If the link cannot be made, e.g. across filesystems or
+            where reflinks are not supported; the target is left untouched.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown link method: {method}")
+    tmp_path = _make_link(source, target, method)
+    try:
+        os.replace(tmp_path, target)
+    except OSError:
+        os.remove(tmp_path)
+        raise
+
+
+def _journal_entry(source: str, target: str, method: str) -> Dict:
+    st = os.stat(target)
+    return {'method': method, 'source': source, 'target': target,
+            'mode': st.st_mode, 'uid': st.st_uid, 'gid': st.st_gid,
+            'atime': st.st_atime, 'mtime': st.st_mtime}
+
+
+def consolidate(selected: List[Dict], groups: List[DuplicateGroup], journal_path: str,
+                method: str = HARDLINK,
+                progress: Optional[Callable[[str, str, int], None]] = None,
+                cancelled: Optional[Callable[[], bool]] = None
+                ) -> Tuple[List[Dict], List[Tuple[Dict, str]]]:
+    """
+    Replace selected duplicates with links to a surviving copy.
+
+    Every path keeps existing while the space of the duplicates is
+    reclaimed without copying data. Each file is checked like a deletion
+    first (see verify_deletions), except that it is always compared with
+    its surviving copy by full hash, since a file merged by mistake cannot
+    be recovered; directories, archive members and near-duplicates are
+    refused. Every replacement is appended to a JSON lines journal, with
+    the owner, permissions and dates of the replaced file, before it is
+    renamed into place, so rollback can undo the batch.
+
+    Args:
+        selected (List[Dict]): File information of the files to replace,
+            taken from the groups.
+        groups (List[DuplicateGroup]): Groups the files belong to.
+        journal_path (str): Journal file, appended to.
+        method (str): HARDLINK or REFLINK.
+        progress (Optional[Callable[[str, str, int], None]]): Called with
+            folder, filename and the number of files handled so far.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+
+    Returns:
+        Tuple[List[Dict], List[Tuple[Dict, str]]]: Files replaced by links,
+            and refused files with the reason.
+
+    Raises:
+        ValueError: If the method is unknown.
+        OSError: If the journal cannot be written.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown link method: {method}")
+    cancelled = cancelled or (lambda: False)
+    selected_ids = {id(f) for f in selected}
+    linked, refused = [], []
+    cache = {}
+    with open(journal_path, 'a', encoding='utf-8') as journal:
+        for group in groups:
+            candidates = [f for f in group.files if id(f) in selected_ids]
+            if not candidates:
+                continue
+            survivors = [f for f in group.files
+                         if id(f) not in selected_ids and 'member' not in f and
+                         not f.get('directory') and os.path.isfile(f['path'])]
+            survivors.sort(key=lambda f: f is not group.keeper)
+            for candidate in candidates:
+                if cancelled():
+                    return linked, refused
+                if progress:
+                    path = Path(candidate['path'])
+                    progress(str(path.parent), path.name, len(linked) + len(refused))
+                if 'member' in candidate:
+                    refused.append((candidate, IN_ARCHIVE))
+                    continue
+                if candidate.get('directory'):
+                    refused.append((candidate, IS_DIRECTORY))
+                    continue
+                if group.similarity is not None:
+                    refused.append((candidate, NOT_IDENTICAL))
+                    continue
+                if not os.path.isfile(candidate['path']):
+                    refused.append((candidate, MISSING))
+                    continue
+                if not survivors:
+                    refused.append((candidate, NO_SURVIVOR))
+                    continue
+                source = next((s for s in survivors if same_content(candidate, s, cache, full=True)), None)
+                if source is None:
+                    refused.append((candidate, CHANGED))
+                    continue
+                if method == HARDLINK and os.path.samefile(source['path'], candidate['path']):
+                    refused.append((candidate, ALREADY_LINKED))
+                    continue
+                # The link is journaled once made, and before it replaces the file
+                tmp_path = None
+                try:
+                    entry = _journal_entry(source['path'], candidate['path'], method)
+                    tmp_path = _make_link(source['path'], candidate['path'], method)
+                    journal.write(json.dumps(entry) + '\n')
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                    os.replace(tmp_path, candidate['path'])
+                except OSError as e:
+                    if tmp_path and os.path.lexists(tmp_path):
+                        os.remove(tmp_path)
+                    refused.append((candidate, str(e)))
+                    continue
+                linked.append(candidate)
+    return linked, refused
+
+
+def rollback(journal_path: str) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    Undo a consolidation by giving every linked path its own copy again.
+
+    Entries are undone newest first. Each path gets an independent copy
+    of its current content, which is the content it had, with its
+    recorded owner, permissions and dates, again renamed into place.
+    Hardlink entries whose link was never made are skipped.
+
+    Args:
+        journal_path (str): Journal written by consolidate.
+
+    Returns:
+        Tuple[List[str], List[Tuple[str, str]]]: Restored paths, and paths
+            that could not be restored with the error.
+
+    Raises:
+        OSError: If the journal cannot be read.
+        ValueError: If the journal is corrupt.
+    """
+    with open(journal_path, encoding='utf-8') as f:
+        try:
+            entries = [json.loads(line) for line in f if line.strip()]
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Corrupt journal {journal_path}: {e}") from None
+    for entry in entries:
+        missing = _JOURNAL_KEYS - entry.keys() if isinstance(entry, dict) else _JOURNAL_KEYS
+        if missing:
+            raise ValueError(f"Corrupt journal {journal_path}: entry without "
+                             f"{', '.join(sorted(missing))}")
+    restored, failed = [], []
+    for entry in reversed(entries):
+        target = entry['target']
+        tmp_path = None
+        try:
+            if entry['method'] == HARDLINK and not (
+                    os.path.exists(entry['source']) and
+                    os.path.samefile(entry['source'], target)):
+                continue
+            tmp_path = _temp_path(target)
+            shutil.copyfile(target, tmp_path)
+            if hasattr(os, 'chown'):
+                st = os.stat(tmp_path)
+                if (st.st_uid, st.st_gid) != (entry['uid'], entry['gid']):
+                    os.chown(tmp_path, entry['uid'], entry['gid'])
+            os.chmod(tmp_path, entry['mode'] & 0o7777)
+            os.utime(tmp_path, (entry['atime'], entry['mtime']))
+            os.replace(tmp_path, target)
+            restored.append(target)
+        except OSError as e:
+            if tmp_path and os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            failed.append((target, str(e)))
+    return restored, failed
@@ -0,0 +1,134 @@
+import math
+import os
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import engine, scanner
+from .engine import ScanConfig
+
+DEFAULT_SPOT_CHECK = 0.01
+
+SIZE_DIFFERS = "size differs"
+CONTENT_DIFFERS = "content differs"
+SPOT_CHECK_FAILED = "content differs despite same size and date"
+UNREADABLE = "could not be read"
+
+
+@dataclass
+class ContainmentReport:
+    """
+    Whether every file of a removable tree has a copy in a master tree.
+
+    present and differing pair each removable file with the master file
+    at the same relative path; missing lists removable files without one.
+    """
+    master_root: str
+    removable_root: str
+    present: List[Tuple[Dict, Dict]] = field(default_factory=list)
+    missing: List[Dict] = field(default_factory=list)
+    differing: List[Tuple[Dict, Dict, str]] = field(default_factory=list)
+    hashed: int = 0
+    spot_checked: int = 0
+    cancelled: bool = False
+
+    @property
+    def contained(self) -> bool:
+        """Whether every removable file was found unchanged in the master."""
+        return not self.cancelled and not self.missing and not self.differing
+
+
+def check_containment(config: ScanConfig, spot_check: float = DEFAULT_SPOT_CHECK,
+                      seed: Optional[int] = None,
+                      progress: Optional[Callable[[str, str, int], None]] = None,
+                      cancelled: Optional[Callable[[], bool]] = None) -> ContainmentReport:
+    """
+    Check that a removable tree is contained in a master tree.
+
+    Files are paired by path relative to their root. Pairs with the same
+    size and dates within the date tolerance are taken as present from
+    their metadata alone, so the check runs at about the speed of the
+    walk. Pairs whose dates differ are hashed in full to tell a touched
+    copy from a changed one; pairs whose sizes differ cannot match. A
+    random spot_check fraction (at least one) of the metadata matches is
+    hashed too, catching content changed behind an unchanged size and
+    date. Every path to a file counts, hardlinks included.
+
+    Args:
+        config (ScanConfig): Settings in 'master' mode with the master and
+            the removable root; the walk, hashing and throttling settings
+            apply.
+        spot_check (float): Fraction of metadata matches checked by content.
+        seed (Optional[int]): Seed of the spot-check sample.
+        progress (Optional[Callable[[str, str, int], None]]): Progress callback.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+
+    Returns:
+        ContainmentReport: The report; flagged cancelled if stopped early.
+
+    Raises:
+        ValueError: If the configuration is not in 'master' mode or the
+            spot-check fraction is out of range.
+        OSError: If a root directory cannot be accessed.
+    """
+    if config.mode != 'master':
+        raise ValueError("Containment is checked in 'master' mode")
+    config.validate()
+    if not 0 <= spot_check <= 1:
+        raise ValueError("Spot-check fraction must be between 0 and 1")
+    cancelled = cancelled or (lambda: False)
+    master_root, removable_root = (str(Path(root).resolve()) for root in config.roots)
+    report = ContainmentReport(master_root, removable_root)
+
+    def walk(root: str) -> Dict[str, Dict]:
+        if progress:
+            progress(root, "Scanning directory", 0)
+        return {os.path.relpath(f['path'], root): f
+                for f in scanner.iter_directory(root, config.recursive, cancelled,
+                                                config.throttle, config.follow_symlinks,
+                                                config.one_file_system, unique_files=False)}
+
+    master = walk(master_root)
+    removable = walk(removable_root)
+    if cancelled():
+        report.cancelled = True
+        return report
+
+    matched, suspect = [], []
+    for relpath in sorted(removable):
+        copy = removable[relpath]
+        original = master.get(relpath)
+        if original is None:
+            report.missing.append(copy)
+        elif original['size'] != copy['size']:
+            report.differing.append((copy, original, SIZE_DIFFERS))
+        elif abs((original['date'] - copy['date']).total_seconds()) <= config.date_tolerance:
+            matched.append((copy, original))
+        else:
+            suspect.append((copy, original))
+
+    spot = []
+    if matched and spot_check > 0:
+        count = min(len(matched), max(1, math.ceil(len(matched) * spot_check)))
+        spot = random.Random(seed).sample(matched, count)
+        spotted = {id(copy) for copy, _ in spot}
+        matched = [pair for pair in matched if id(pair[0]) not in spotted]
+    report.present.extend(matched)
+
+    to_hash = [f for pair in suspect + spot for f in pair]
+    hashed = {id(f) for f in engine.hash_files(config, to_hash, progress, cancelled)}
+    if cancelled():
+        report.cancelled = True
+        return report
+    report.hashed = len(hashed)
+    report.spot_checked = len(spot)
+    for pairs, reason in ((suspect, CONTENT_DIFFERS), (spot, SPOT_CHECK_FAILED)):
+        for copy, original in pairs:
+            if id(copy) not in hashed or id(original) not in hashed:
+                report.differing.append((copy, original, UNREADABLE))
+            elif copy['hash'] == original['hash']:
+                report.present.append((copy, original))
+            else:
+                report.differing.append((copy, original, reason))
+    return report
@@ -0,0 +1,303 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from . import engine, persistence, scanner
+from .engine import ScanConfig
+from .hash_cache import HashCache
+from .watcher import PollingWatcher, create_watcher
+
+
+class WarmIndex:
+    """
+    Directory listings kept between searches.
+
+    Every root is walked once per walk settings (recursion, symlinks,
+    filesystem boundary); later searches get
+    copies of the stored records, so nothing is read from disk until the
+    listing is revalidated. generation changes whenever a listing is
+    revalidated.
+
+    Args:
+        on_new_root (Optional[Callable[[str, bool], None]]): Called with a
+            root and its recursive setting before it is first walked, e.g.
+            to start watching it.
+    """
+
+    def __init__(self, on_new_root: Optional[Callable[[str, bool], None]] = None):
+        self.on_new_root = on_new_root
+        self.generation = 0
+        # (resolved root, recursive, follow_symlinks, one_file_system) -> files sorted by path
+        self._listings = {}
+        self._lock = threading.Lock()
+
+    def scan(self, config: ScanConfig, root: str,
+             cancelled: Optional[Callable[[], bool]] = None) -> List[Dict]:
+        """List a root like engine.scan_root, walking it only the first time."""
+        key = (str(Path(root).resolve()), config.recursive,
+               config.follow_symlinks, config.one_file_system)
+        with self._lock:
+            files = self._listings.get(key)
+        if files is None:
+            if self.on_new_root:
+                self.on_new_root(*key[:2])
+            files = engine.scan_root(config, root, cancelled)
+            if cancelled and cancelled():
+                return files
+            with self._lock:
+                self._listings[key] = files
+        return [dict(f) for f in files]
+
+    def revalidate(self, paths: Optional[List[str]] = None, subtree: bool = True) -> int:
+        """
+        List directories again after they changed.
+
+        Args:
+            paths (Optional[List[str]]): Changed directories; None lists
+                every indexed root again.
+            subtree (bool): Whether the subdirectories changed too, or only
+                the files directly in the directories.
+
+        Returns:
+            int: Number of files listed under the revalidated directories.
+        """
+        with self._lock:
+            keys = list(self._listings)
+        if paths is None:
+            paths = [key[0] for key in keys]
+        listed = 0
+        for path in paths:
+            path = str(Path(path).resolve())
+            for key in keys:
+                root, recursive, follow_symlinks, one_file_system = key
+                if path != root and not (recursive and path.startswith(root + os.sep)):
+                    continue
+                deep = recursive and subtree
+                try:
+                    if one_file_system and os.stat(path).st_dev != os.stat(root).st_dev:
+                        fresh = []  # A mount point the walk does not enter
+                    else:
+                        fresh = list(scanner.iter_directory(path, deep, None, None,
+                                                            follow_symlinks, one_file_system))
+                except OSError:
+                    fresh = []  # Directory removed
+                listed += len(fresh)
+                prefix = path + os.sep
+                # A relisted file may be kept elsewhere under another path
+                relisted = {f['inode'] for f in fresh}
+                with self._lock:
+                    files = [f for f in self._listings[key]
+                             if not (deep and f['path'].startswith(prefix)) and
+                             os.path.dirname(f['path']) != path and
+                             f.get('inode') not in relisted]
+                    self._listings[key] = sorted(files + fresh, key=lambda f: f['path'])
+                    self.generation += 1
+        return listed
+
+    def status(self) -> List[Dict]:
+        """Indexed roots with their file counts."""
+        with self._lock:
+            return [{'root': root, 'recursive': recursive, 'follow_symlinks': follow_symlinks,
+                     'one_file_system': one_file_system, 'files': len(files)}
+                    for (root, recursive, follow_symlinks, one_file_system), files
+                    in self._listings.items()]
+
+
+class Daemon:
+    """
+    Long-running search service keeping the index and hashes warm.
+
+    Requests are JSON objects with an 'op' and its parameters, one per
+    line on a Unix-domain socket; each gets one JSON line back with 'ok'
+    and either 'result' or 'error'. Operations:
+
+    - ping: returns "pong"
+    - scan: runs a search for 'config' (ScanConfig fields) and returns it
+      in the persistence format
+    - query: returns the groups of the last search containing 'path'
+    - revalidate: walks 'paths' (or every root) again
+    - status: indexed roots and cache size
+    - shutdown: stops the daemon
+
+    With watch set, indexed roots are watched and changed directories
+    listed again as soon as they change; a search whose settings were
+    already searched and whose listings did not change since then is
+    answered from the previous result without touching the disk.
+
+    Args:
+        socket_path (str): Unix-domain socket to listen on.
+        watch (bool): Whether to watch the indexed roots for changes.
+    """
+
+    def __init__(self, socket_path: str, watch: bool = False):
+        self.socket_path = socket_path
+        self.watcher = create_watcher() if watch else None
+        self.index = WarmIndex(self._watch if watch else None)
+        self.hash_cache = HashCache()
+        self.last_result = None
+        self.server = None
+        self._results = {}  # settings -> (index generation, encoded result)
+        self._stopping = threading.Event()
+        self._search_lock = threading.Lock()
+        self._watcher_lock = threading.Lock()
+        self._operations = {
+            'ping': lambda request: 'pong',
+            'scan': self.scan,
+            'query': self.query,
+            'revalidate': lambda request: self.index.revalidate(request.get('paths')),
+            'status': self.status,
+            'shutdown': self.shutdown,
+        }
+
+    def handle(self, request: Dict) -> Any:
+        """
+        Run one request.
+
+        Raises:
+            ValueError: If the operation is unknown or its parameters invalid.
+            OSError: If a directory cannot be accessed.
+        """
+        operation = self._operations.get(request.get('op'))
+        if operation is None:
+            raise ValueError(f"Unknown operation: {request.get('op')}")
+        return operation(request)
+
+    def scan(self, request: Dict) -> Dict:
+        try:
+            config = ScanConfig(**request['config'])
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid scan configuration: {e}") from None
+        key = json.dumps(request['config'], sort_keys=True)
+        # One search at a time, so concurrent clients share the warm state
+        with self._search_lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[0] == self.index.generation:
+                return cached[1]
+            generation = self.index.generation
+            result = engine.search(config, scan=self.index.scan, hash_cache=self.hash_cache)
+            self.last_result = result
+            encoded = persistence.encode_result(result)
+            if not (result.cancelled or result.budget_exhausted):
+                # Results of older generations can never be served again
+                self._results = {k: v for k, v in self._results.items()
+                                 if v[0] == generation}
+                self._results[key] = (generation, encoded)
+        return encoded
+
+    def _watch(self, root: str, recursive: bool):
+        watcher = self.watcher
+        try:
+            watcher.add(root, recursive)
+        except OSError:
+            # Out of inotify watches
+            self._poll_instead(watcher, {root: recursive})
+
+    def _poll_instead(self, failed, roots: Optional[Dict[str, bool]] = None):
+        """Replace a failed watcher with a PollingWatcher on the same roots."""
+        with self._watcher_lock:
+            if self.watcher is not failed:
+                return  # Already replaced
+            roots = dict(failed.roots, **(roots or {}))
+            try:
+                failed.close()
+            except OSError:
+                pass
+            watcher = PollingWatcher()
+            for path, recursive in roots.items():
+                watcher.add(path, recursive)
+            self.watcher = watcher
+
+    def _apply_changes(self):
+        watcher = self.watcher
+        while not self._stopping.is_set():
+            try:
+                changes = watcher.changes(1.0)
+            except (OSError, ValueError):
+                # inotify ran out of watches for a new directory, or its
+                # descriptor was closed when _watch switched to polling
+                if self._stopping.is_set():
+                    return
+                self._poll_instead(watcher)
+                changes = {}
+            for path, subtree in changes.items():
+                self.index.revalidate([path], subtree)
+            if self.watcher is not watcher:
+                # Changes made while switching watchers may have been missed
+                watcher = self.watcher
+                self.index.revalidate()
+
+    def query(self, request: Dict) -> List[Dict]:
+        if self.last_result is None:
+            return []
+        path = str(Path(request['path']).resolve())
+        return [persistence.encode_group(group) for group in self.last_result.groups
+                if any(f['path'] == path for f in group.files)]
+
+    def status(self, request: Dict) -> Dict:
+        return {'roots': self.index.status(), 'hashes': len(self.hash_cache),
+                'watcher': type(self.watcher).__name__ if self.watcher else None}
+
+    def shutdown(self, request: Dict) -> str:
+        # shutdown() waits for serve_forever, so it cannot run in a handler
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+        return 'stopping'
+
+    def serve_forever(self):
+        """
+        Listen on the socket until a shutdown request.
+
+        Raises:
+            OSError: If the socket cannot be created or another daemon
+                already listens on it.
+        """
+        if not hasattr(socket, 'AF_UNIX'):
+            raise OSError("Daemon mode needs Unix-domain sockets")
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.remove(self.socket_path)  # Left over by a daemon that died
+            else:
+                raise OSError(f"A daemon is already listening on {self.socket_path}")
+            finally:
+                probe.close()
+
+        # Created private, so no other user can connect before it is served
+        umask = os.umask(0o177)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.socket_path,
+                                                                 _RequestHandler)
+        finally:
+            os.umask(umask)
+        self.server.daemon_threads = True
+        self.server.service = self
+        if self.watcher:
+            threading.Thread(target=self._apply_changes, daemon=True).start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self._stopping.set()
+            if self.watcher:
+                self.watcher.close()
+            self.server.server_close()
+            os.remove(self.socket_path)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("Request must be a JSON object")
+                response = {'ok': True, 'result': self.server.service.handle(request)}
+            except Exception as e:
+                # Any failure gets an error reply, not a dropped connection
+                response = {'ok': False, 'error': str(e) or type(e).__name__}
+            self.wfile.write(json.dumps(response, separators=(',', ':')).encode() + b'\n')
+            self.wfile.flush()
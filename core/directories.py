@@ -0,0 +1,178 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .hashing import get_file_hash
+
+
+def _digest(entries: List[tuple]) -> str:
+    hasher = hashlib.md5()
+    for kind, name, digest in sorted(entries):
+        hasher.update(f"{kind}\0{name}\0{digest}\n".encode('utf-8', 'surrogateescape'))
+    return hasher.hexdigest()
+
+
+def impossible_directories(files: List[Dict]) -> Set[str]:
+    """
+    Find the directories that cannot have an identical copy.
+
+    An identical copy of a directory holds a file of the same size for
+    every file in it, so a directory with a file of a unique size, and
+    every directory above it, can be ruled out before hashing anything.
+
+    Args:
+        files (List[Dict]): Scanned files.
+
+    Returns:
+        Set[str]: Paths of the directories ruled out.
+    """
+    counts = {}
+    for f in files:
+        counts[f['size']] = counts.get(f['size'], 0) + 1
+    ruled_out = set()
+    for f in files:
+        if counts[f['size']] > 1:
+            continue
+        directory = os.path.dirname(f['path'])
+        while directory not in ruled_out:
+            ruled_out.add(directory)
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+    return ruled_out
+
+
+def directory_entries(files: Iterable[Dict], roots: List[str]) -> List[Dict]:
+    """
+    Compute a Merkle digest for every directory, bottom-up.
+
+    The digest of a directory covers the names and content hashes of its
+    files and the names and digests of its subdirectories, so two
+    directories have the same digest exactly when their trees are
+    identical. A directory with a file that was not hashed gets no entry,
+    and neither do the directories above it.
+
+    Args:
+        files (Iterable[Dict]): Scanned files tagged with their 'root'; the
+            ones that may be in an identical directory carry a 'hash'.
+        roots (List[str]): Root directories, in the order of the 'root' tags.
+
+    Returns:
+        List[Dict]: One entry per digestable directory below or at a root,
+            shaped like file information with 'directory' set, the total
+            'size', the latest 'date', the digest as 'hash' and the number
+            of files as 'file_count'.
+    """
+    roots = [str(Path(root).resolve()) for root in roots]
+    children = {}   # directory -> [(kind, name, digest)]
+    totals = {}     # directory -> [size, date, file count, root]
+    incomplete = set()
+    for f in files:
+        if 'member' in f:
+            continue  # Archive members are not part of the directory tree
+        directory = os.path.dirname(f['path'])
+        total = totals.setdefault(directory, [0, f['date'], 0, f['root']])
+        total[0] += f['size']
+        total[1] = max(total[1], f['date'])
+        total[2] += 1
+        if 'hash' not in f or f.get('sampled'):
+            incomplete.add(directory)
+        else:
+            children.setdefault(directory, []).append(('f', f['name'], f['hash']))
+
+    # Register every directory between a file and its root, so that
+    # directories holding only subdirectories get an entry too
+    for directory in list(totals):
+        root = roots[totals[directory][3]]
+        while directory != root and directory.startswith(root + os.sep):
+            parent = os.path.dirname(directory)
+            if parent not in totals:
+                totals[parent] = [0, totals[directory][1], 0, totals[directory][3]]
+            directory = parent
+
+    entries = []
+    # Deepest first, so every subdirectory is digested before its parent
+    for directory in sorted(totals, key=lambda d: d.count(os.sep), reverse=True):
+        size, date, count, root_index = totals[directory]
+        root = roots[root_index]
+        is_root = directory == root
+        parent = os.path.dirname(directory)
+        if directory in incomplete:
+            if not is_root:
+                incomplete.add(parent)
+            continue
+        digest = _digest(children.get(directory, []))
+        entries.append({'name': os.path.basename(directory), 'path': directory,
+                        'size': size, 'date': date, 'hash': digest, 'root': root_index,
+                        'directory': True, 'file_count': count})
+        if not is_root:
+            children.setdefault(parent, []).append(('d', entries[-1]['name'], digest))
+            totals[parent][0] += size
+            totals[parent][1] = max(totals[parent][1], date)
+            totals[parent][2] += count
+    return entries
+
+
+def maximal_groups(groups: List) -> List:
+    """
+    Drop directory groups already covered by a larger identical directory.
+
+    Args:
+        groups (List): DuplicateGroups of directory entries.
+
+    Returns:
+        List: Shallowest groups first, without the groups whose copies to
+            report (the redundant ones, or all of them without a keeper)
+            all lie inside directories of a group kept before.
+    """
+    ordered = sorted(groups, key=lambda g: min(f['path'].count(os.sep) for f in g.files))
+    covered = set()
+    kept = []
+    for group in ordered:
+        reported = group.redundant if group.keeper is not None else group.files
+        if all(inside(f['path'], covered) for f in reported):
+            continue
+        kept.append(group)
+        covered.update(f['path'] for f in group.files)
+    return kept
+
+
+def inside(path: str, directories: Set[str]) -> bool:
+    """Whether a path lies strictly inside one of the directories."""
+    parent = os.path.dirname(path)
+    while parent != path:
+        if parent in directories:
+            return True
+        path, parent = parent, os.path.dirname(parent)
+    return False
+
+
+def directory_digest(path: str) -> Optional[str]:
+    """
+    Compute the Merkle digest of a directory on disk, hashing every file.
+
+    Args:
+        path (str): Directory to digest.
+
+    Returns:
+        Optional[str]: Digest comparable with directory_entries, or None
+            if the directory holds no file.
+
+    Raises:
+        OSError: If a file or directory cannot be read.
+    """
+    entries = []
+    has_files = False
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file():
+                entries.append(('f', entry.name, get_file_hash(entry.path)))
+                has_files = True
+            elif entry.is_dir(follow_symlinks=False):
+                digest = directory_digest(entry.path)
+                if digest is not None:
+                    entries.append(('d', entry.name, digest))
+                    has_files = True
+    return _digest(entries) if has_files else None
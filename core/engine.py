@@ -0,0 +1,821 @@
+import dataclasses
+import functools
+import itertools
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from . import archives, async_scanner, directories, scanner, similarity
+from .external_sort import ExternalSorter, iter_runs
+from .master_index import DEFAULT_CAPACITY, MasterIndex
+from .parallel import BucketMatcher
+from .grouping import (DEFAULT_DATE_TOLERANCE, assign_keepers, duplicate_key,
+                       find_in_master, group_duplicates)
+from .hashing import DEFAULT_SAMPLES, SAMPLE_BLOCK_SIZE
+from .names import DEFAULT_NAME_DISTANCE, NAME_MODES
+from .throttle import Throttle, shared_throttle
+
+MODES = ('single', 'master', 'multi')
+CONFIRMED = 'confirmed'
+PROBABLE = 'probable'
+SIMILAR = 'similar'
+QUICK_MIN_SIZE = 64 * 1024 * 1024
+HASH_BATCH_SIZE = 1024
+
+
+@dataclass
+class ScanConfig:
+    """
+    Settings of a duplicate search.
+
+    In 'single' mode roots holds one directory, in 'master' mode the master
+    and the removable directory, and in 'multi' mode any number of
+    directories in priority order. In quick mode files of quick_min_size
+    bytes or more are compared by sampled blocks rather than a full hash.
+    Setting memory_limit_mb bounds the memory of the matching stage by
+    spilling sorted records to temp_dir. With workers other than one,
+    hashed size buckets are matched on a process pool (0 = one per CPU).
+    In 'master' mode, compact_master keeps the master side in a Bloom
+    filter sized for master_capacity files backed by an on-disk index
+    instead of in memory. A time_budget (seconds) or byte_budget (bytes
+    read) hashes the size buckets with the most reclaimable space first
+    and stops when the budget runs out. With match_directories, identical
+    directory trees are reported as single entries instead of their files.
+    With scan_archives, the members of zip and tar archives are matched
+    too, hashed from memory; they are reported but cannot be deleted.
+    Setting similarity_threshold finds near-duplicates instead: files
+    whose estimated chunk similarity reaches the threshold, whatever the
+    name, size and date criteria. name_matching picks how match_name
+    compares names: 'exact', 'normalized' (case, Unicode form and copy
+    markers such as "Copy of" or " (1)" ignored) or 'fuzzy' (normalized
+    names within name_distance edits). read_limit_mb (MB/s), iops_limit,
+    cpu_share, max_load and max_iowait throttle the walk and the hashing
+    (see core.throttle.Throttle). Symlinks are skipped unless
+    follow_symlinks is set, and one_file_system keeps each walk on the
+    filesystem of its root; paths leading to one file always give a single
+    record.
+    """
+    roots: List[str]
+    mode: str = 'single'
+    recursive: bool = True
+    match_name: bool = True
+    match_size: bool = True
+    match_date: bool = False
+    date_tolerance: float = DEFAULT_DATE_TOLERANCE
+    async_scan: bool = False
+    concurrency: int = async_scanner.DEFAULT_CONCURRENCY
+    chunk_size: Optional[int] = None
+    use_mmap: bool = True
+    quick: bool = False
+    quick_min_size: int = QUICK_MIN_SIZE
+    memory_limit_mb: Optional[int] = None
+    temp_dir: Optional[str] = None
+    workers: int = 1
+    compact_master: bool = False
+    master_capacity: int = DEFAULT_CAPACITY
+    time_budget: Optional[float] = None
+    byte_budget: Optional[int] = None
+    match_directories: bool = False
+    scan_archives: bool = False
+    similarity_threshold: Optional[float] = None
+    name_matching: str = 'exact'
+    name_distance: int = DEFAULT_NAME_DISTANCE
+    read_limit_mb: Optional[float] = None
+    iops_limit: Optional[float] = None
+    cpu_share: Optional[float] = None
+    max_load: Optional[float] = None
+    max_iowait: Optional[float] = None
+    follow_symlinks: bool = False
+    one_file_system: bool = False
+
+    def validate(self):
+        """
+        Check that the configuration can be searched.
+
+        Raises:
+            ValueError: If the mode or the number of roots is invalid.
+        """
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown mode: {self.mode}")
+        expected = {'single': 1, 'master': 2}.get(self.mode)
+        if expected is not None and len(self.roots) != expected:
+            raise ValueError(f"Mode '{self.mode}' needs {expected} directories")
+        if self.mode == 'multi' and len(self.roots) < 2:
+            raise ValueError("Mode 'multi' needs at least two directories")
+        if not all(self.roots):
+            raise ValueError("Directory path must not be empty")
+        if self.budgeted and (self.memory_limit_mb or
+                              (self.mode == 'master' and self.compact_master)):
+            raise ValueError("Budgets cannot be combined with a memory limit "
+                             "or a compact master index")
+        if self.match_directories and (self.budgeted or self.memory_limit_mb or
+                                       (self.mode == 'master' and self.compact_master)):
+            raise ValueError("Directory matching cannot be combined with budgets, "
+                             "a memory limit or a compact master index")
+        if self.scan_archives and (self.memory_limit_mb or
+                                   (self.mode == 'master' and self.compact_master)):
+            raise ValueError("Archive scanning cannot be combined with a memory limit "
+                             "or a compact master index")
+        if self.name_matching not in NAME_MODES:
+            raise ValueError(f"Unknown name matching: {self.name_matching}")
+        if self.name_distance < 0:
+            raise ValueError("Name distance must not be negative")
+        if (self.match_name and self.name_matching != 'exact' and
+                self.mode == 'master' and self.compact_master):
+            raise ValueError("Only exact names can be matched with a compact master index")
+        for limit, label in ((self.read_limit_mb, "Read limit"), (self.iops_limit, "IOPS limit"),
+                             (self.max_load, "Maximum load")):
+            if limit is not None and limit <= 0:
+                raise ValueError(f"{label} must be positive")
+        for limit, label in ((self.cpu_share, "CPU share"), (self.max_iowait, "Maximum I/O wait")):
+            if limit is not None and not 0 < limit <= 1:
+                raise ValueError(f"{label} must be between 0 and 1")
+        if self.similarity_threshold is not None:
+            if not 0 < self.similarity_threshold <= 1:
+                raise ValueError("Similarity threshold must be between 0 and 1")
+            if (self.budgeted or self.memory_limit_mb or self.match_directories or
+                    self.scan_archives or (self.mode == 'master' and self.compact_master)):
+                raise ValueError("Near-duplicate search cannot be combined with budgets, "
+                                 "a memory limit, directories, archives or a compact "
+                                 "master index")
+
+    @property
+    def budgeted(self) -> bool:
+        """Whether the search stops after a time or byte budget."""
+        return self.time_budget is not None or self.byte_budget is not None
+
+    @property
+    def throttle(self) -> Optional[Throttle]:
+        """The throttle shared by searches with these limits, if any."""
+        return shared_throttle(self.read_limit_mb, self.iops_limit, self.cpu_share,
+                               self.max_load, self.max_iowait)
+
+
+@dataclass
+class DuplicateGroup:
+    """
+    Files with the same content, with the copy to keep if there is one.
+
+    Near-duplicate groups also carry the lowest estimated similarity
+    between the files that joined them.
+    """
+    files: List[Dict]
+    keeper: Optional[Dict] = None
+    similarity: Optional[float] = None
+
+    @property
+    def redundant(self) -> List[Dict]:
+        """Copies other than the keeper."""
+        return [f for f in self.files if f is not self.keeper]
+
+    @property
+    def status(self) -> str:
+        """SIMILAR for near-duplicates, PROBABLE while any copy was only
+        compared by sampled blocks."""
+        if self.similarity is not None:
+            return SIMILAR
+        return PROBABLE if any(f.get('sampled') for f in self.files) else CONFIRMED
+
+    @property
+    def reclaimable(self) -> int:
+        """Bytes freed by removing the redundant copies; without a keeper,
+        the first copy is the one kept."""
+        removed = self.redundant if self.keeper is not None else self.files[1:]
+        return sum(f['size'] for f in removed)
+
+
+@dataclass
+class SearchResult:
+    """Outcome of a duplicate search."""
+    config: ScanConfig
+    groups: List[DuplicateGroup] = field(default_factory=list)
+    files_scanned: int = 0
+    started: datetime = field(default_factory=datetime.now)
+    finished: Optional[datetime] = None
+    cancelled: bool = False
+    budget_exhausted: bool = False
+
+    def duplicates(self) -> List[Dict]:
+        """
+        Files to present to the user.
+
+        Returns:
+            List[Dict]: Every copy in 'single' mode, otherwise the redundant
+                copies only.
+        """
+        if self.config.mode == 'single':
+            return [f for group in self.groups for f in group.files]
+        return [f for group in self.groups for f in group.redundant]
+
+    @property
+    def reclaimable(self) -> int:
+        """Bytes freed by removing every redundant copy."""
+        return sum(group.reclaimable for group in self.groups)
+
+
+def scan_root(config: ScanConfig, root: str,
+              cancelled: Optional[Callable[[], bool]] = None) -> List[Dict]:
+    """
+    Scan one root directory without hashing, with the configured scanner.
+
+    Args:
+        config (ScanConfig): Search settings.
+        root (str): Directory to scan.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+
+    Returns:
+        List[Dict]: File information sorted by path.
+
+    Raises:
+        OSError: If the directory cannot be accessed.
+    """
+    if config.async_scan:
+        fs = async_scanner.LocalFileSystem(throttle=config.throttle)
+        return async_scanner.scan_directory(root, config.recursive, config.concurrency, fs,
+                                            cancelled, config.follow_symlinks,
+                                            config.one_file_system)
+    return scanner.scan_directory(root, config.recursive, cancelled, config.throttle,
+                                  config.follow_symlinks, config.one_file_system)
+
+
+def scan_roots(config: ScanConfig,
+               progress: Optional[Callable[[str, str, int], None]] = None,
+               cancelled: Optional[Callable[[], bool]] = None,
+               scan: Callable = scan_root) -> List[Dict]:
+    """
+    Scan every root once into a single index, without hashing.
+
+    Args:
+        config (ScanConfig): Search settings.
+        progress (Optional[Callable[[str, str, int], None]]): Progress callback.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+        scan (Callable): Function with the signature of scan_root listing
+            one root; lets a caller serve listings from its own index.
+
+    Returns:
+        List[Dict]: File information tagged with the index of its 'root'.
+            Files reachable from several roots, by the same path or by
+            links, are kept once, under the first root.
+
+    Raises:
+        OSError: If a root directory cannot be accessed.
+    """
+    cancelled = cancelled or (lambda: False)
+    index = []
+    seen = set()
+    for root_index, root in enumerate(config.roots):
+        if cancelled():
+            break
+        if progress:
+            progress(root, "Scanning directory", 0)
+        for file_info in scan(config, root, cancelled):
+            # Roots may overlap, or reach the same files through links
+            identity = file_info.get('inode', file_info['path'])
+            if identity in seen:
+                continue
+            seen.add(identity)
+            file_info['root'] = root_index
+            index.append(file_info)
+            if config.scan_archives and archives.is_archive(file_info['path']):
+                try:
+                    members = archives.list_members(file_info)
+                except archives.ARCHIVE_ERRORS as e:
+                    print(f"Error processing {file_info['path']}: {str(e)}")
+                    continue
+                for member in members:
+                    member['root'] = root_index
+                    index.append(member)
+    return index
+
+
+def candidate_buckets(config: ScanConfig, index: List[Dict]) -> List[List[Dict]]:
+    """
+    Bucket the scanned files by size, keeping only buckets with collisions.
+
+    Identical contents imply identical sizes, so a file with a unique size
+    cannot have a duplicate and never needs to be read. Buckets made only
+    of zip members are split further by their stored CRC.
+
+    Args:
+        config (ScanConfig): Search settings.
+        index (List[Dict]): Scanned files.
+
+    Returns:
+        List[List[Dict]]: Files to hash, one list per size.
+    """
+    by_size = {}
+    for file_info in index:
+        by_size.setdefault(file_info['size'], []).append(file_info)
+
+    buckets = []
+    for size_bucket in by_size.values():
+        if len(size_bucket) < 2:
+            continue
+        for bucket in archives.split_by_crc(size_bucket):
+            if config.mode == 'master' and len({f['root'] for f in bucket}) < 2:
+                continue
+            buckets.append(bucket)
+    return buckets
+
+
+def potential_reclaimable(config: ScanConfig, bucket: List[Dict]) -> int:
+    """
+    Bytes freed if every file of a size bucket turned out to be a duplicate.
+
+    Args:
+        config (ScanConfig): Search settings.
+        bucket (List[Dict]): Scanned files of the same size.
+
+    Returns:
+        int: Size times the number of copies that would be redundant.
+    """
+    if config.mode == 'master':
+        copies = sum(1 for f in bucket if f['root'] != 0)
+    else:
+        copies = len(bucket) - 1
+    return bucket[0]['size'] * copies
+
+
+def hash_cost(config: ScanConfig, bucket: List[Dict]) -> int:
+    """Bytes read to hash a size bucket, counting sampled blocks in quick mode."""
+    size = bucket[0]['size']
+    if config.quick and size >= config.quick_min_size:
+        size = min(size, DEFAULT_SAMPLES * SAMPLE_BLOCK_SIZE)
+    return size * len(bucket)
+
+
+def _hash_files(config: ScanConfig, files: List[Dict], progress, cancelled,
+                quick_min_size: Optional[int], hash_cache=None) -> List[Dict]:
+    if hash_cache is not None:
+        pending = [f for f in files if not hash_cache.fill(f, quick_min_size)]
+        hashed = _hash_files(config, pending, progress, cancelled, quick_min_size)
+        hash_cache.update(hashed)
+        failed = {id(f) for f in pending} - {id(f) for f in hashed}
+        return [f for f in files if id(f) not in failed]
+    members = [f for f in files if 'member' in f]
+    if members:
+        files = [f for f in files if 'member' not in f]
+        return (_hash_files(config, files, progress, cancelled, quick_min_size) +
+                archives.hash_members(members, progress, cancelled))
+    if config.async_scan:
+        fs = async_scanner.LocalFileSystem(config.chunk_size, config.use_mmap, config.throttle)
+        return async_scanner.hash_files(files, config.concurrency, fs, progress,
+                                        cancelled, quick_min_size)
+    return scanner.hash_files(files, progress, cancelled, config.chunk_size,
+                              config.use_mmap, quick_min_size, config.throttle)
+
+
+def hash_files(config: ScanConfig, files: List[Dict],
+               progress: Optional[Callable[[str, str, int], None]] = None,
+               cancelled: Optional[Callable[[], bool]] = None,
+               quick_min_size: Optional[int] = None) -> List[Dict]:
+    """
+    Hash files with the configured hasher and limits.
+
+    Args:
+        config (ScanConfig): Search settings.
+        files (List[Dict]): Files to hash; their 'hash' is set.
+        progress (Optional[Callable[[str, str, int], None]]): Progress callback.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+        quick_min_size (Optional[int]): Size from which files are only
+            sampled; None hashes every file in full.
+
+    Returns:
+        List[Dict]: The files that could be hashed.
+    """
+    return _hash_files(config, files, progress, cancelled, quick_min_size)
+
+
+def match_files(config: ScanConfig, files: List[Dict]) -> List[DuplicateGroup]:
+    """
+    Group hashed files into duplicate groups according to the mode.
+
+    Args:
+        config (ScanConfig): Search settings.
+        files (List[Dict]): Hashed files tagged with their 'root'.
+
+    Returns:
+        List[DuplicateGroup]: Duplicate groups; every group has a keeper
+            except in 'single' mode.
+    """
+    criteria = (config.match_name, config.match_size,
+                config.match_date, config.date_tolerance,
+                config.name_matching, config.name_distance)
+    if config.mode == 'single':
+        return [DuplicateGroup(files=group) for group in group_duplicates(files, *criteria)]
+
+    if config.mode == 'master':
+        master = [f for f in files if f['root'] == 0]
+        removable = [f for f in files if f['root'] == 1]
+        groups = find_in_master(master, removable, *criteria)
+    else:
+        groups = assign_keepers(group_duplicates(files, *criteria))
+    return [DuplicateGroup(files=[g['keeper']] + g['redundant'], keeper=g['keeper'])
+            for g in groups]
+
+
+def search(config: ScanConfig,
+           progress: Optional[Callable[[str, str, int], None]] = None,
+           cancelled: Optional[Callable[[], bool]] = None,
+           on_group: Optional[Callable[[DuplicateGroup], None]] = None,
+           scan: Callable = scan_root, hash_cache=None) -> SearchResult:
+    """
+    Run a complete duplicate search.
+
+    Size buckets are hashed and matched one batch at a time, so groups are
+    reported through on_group while the search is still running. With a
+    budget, buckets go in order of potential reclaimable bytes; buckets
+    that no longer fit the byte budget are skipped, and the time budget
+    stops the search, dropping the batch in flight.
+
+    Args:
+        config (ScanConfig): Search settings.
+        progress (Optional[Callable[[str, str, int], None]]): Called with
+            folder, filename and the number of duplicate files found so far.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+        on_group (Optional[Callable[[DuplicateGroup], None]]): Called from
+            the searching thread with every group as soon as it is found.
+        scan (Callable): Lists one root, see scan_roots.
+        hash_cache (Optional[HashCache]): Hashes to reuse and update. The
+            scan function and the cache are only used by the in-memory
+            pipeline, not with a memory limit or a compact master index.
+
+    Returns:
+        SearchResult: Duplicate groups found; cancelled is set when the
+            search was stopped early and budget_exhausted when part of the
+            work was left out to honour a budget.
+
+    Raises:
+        ValueError: If the configuration is invalid.
+        OSError: If a root directory cannot be accessed.
+    """
+    config.validate()
+    cancelled = cancelled or (lambda: False)
+    result = SearchResult(config=config)
+    matched = 0
+
+    def report(folder: str, filename: str, _count: int):
+        if progress:
+            progress(folder, filename, matched)
+
+    def emit(groups: List[DuplicateGroup]):
+        nonlocal matched
+        for group in groups:
+            result.groups.append(group)
+            matched += len(group.files if config.mode == 'single' else group.redundant)
+            if on_group:
+                on_group(group)
+
+    if config.mode == 'master' and config.compact_master:
+        _search_compact_master(config, result, report, cancelled, emit)
+    elif config.memory_limit_mb:
+        _search_external(config, result, report, cancelled, emit)
+    elif config.similarity_threshold is not None:
+        _search_similar(config, result, report, cancelled, emit, scan)
+    elif config.match_directories:
+        _search_directories(config, result, report, cancelled, emit, scan, hash_cache)
+    else:
+        if config.time_budget is not None:
+            deadline = time.monotonic() + config.time_budget
+            stopped = lambda: cancelled() or time.monotonic() >= deadline
+        else:
+            stopped = cancelled
+        index = scan_roots(config, report, stopped, scan)
+        result.files_scanned = len(index)
+        result.budget_exhausted = stopped() and not cancelled()
+        quick_min_size = config.quick_min_size if config.quick else None
+        # The async hasher and the process pool need many files at once
+        batch_size = HASH_BATCH_SIZE if config.async_scan or config.workers != 1 else 1
+        batch = []
+        buckets = candidate_buckets(config, index)
+        if config.budgeted:
+            buckets.sort(key=lambda b: potential_reclaimable(config, b), reverse=True)
+        bytes_left = config.byte_budget
+        matcher = BucketMatcher(functools.partial(match_files, config), DuplicateGroup,
+                            emit, config.workers)
+        try:
+            for i, bucket in enumerate(buckets):
+                if bytes_left is not None:
+                    cost = hash_cost(config, bucket)
+                    if cost > bytes_left:
+                        result.budget_exhausted = True
+                    else:
+                        bytes_left -= cost
+                        batch.extend(bucket)
+                else:
+                    batch.extend(bucket)
+                if len(batch) < batch_size and i < len(buckets) - 1:
+                    continue
+                hashed = _hash_files(config, batch, report, stopped, quick_min_size,
+                                     hash_cache)
+                if stopped():
+                    result.budget_exhausted = result.budget_exhausted or not cancelled()
+                    break
+                matcher.submit(hashed)
+                batch = []
+        finally:
+            matcher.close(cancel=cancelled())
+
+    result.cancelled = cancelled()
+    result.finished = datetime.now()
+    return result
+
+
+def _search_similar(config: ScanConfig, result: SearchResult, progress, cancelled,
+                    emit, scan):
+    """
+    Search for near-duplicates with MinHash signatures and LSH.
+
+    Files sharing a size are hashed first, so byte-identical copies share
+    the signature of one of them; every other non-empty file gets a
+    signature of its content-defined chunks. Clusters of similar files
+    are then kept according to the mode, as for exact duplicates.
+    """
+    index = scan_roots(config, progress, cancelled, scan)
+    result.files_scanned = len(index)
+    by_size = {}
+    for i, file_info in enumerate(index):
+        if file_info['size']:
+            by_size.setdefault(file_info['size'], []).append(i)
+    colliding = [index[i] for ids in by_size.values() if len(ids) > 1 for i in ids]
+    hashed = {id(f) for f in _hash_files(config, colliding, progress, cancelled, None)}
+    if cancelled():
+        return
+    copies = {}  # representative -> indexes of its byte-identical copies
+    first_copy = {}
+    for i, file_info in enumerate(index):
+        if not file_info['size']:
+            continue
+        if len(by_size[file_info['size']]) == 1:
+            copies[i] = [i]
+        elif id(file_info) in hashed:
+            key = (file_info['size'], file_info['hash'])
+            copies.setdefault(first_copy.setdefault(key, i), []).append(i)
+
+    signatures = {}
+    for i in copies:
+        if cancelled():
+            return
+        file_info = index[i]
+        if progress:
+            progress(os.path.dirname(file_info['path']), file_info['name'], 0)
+        try:
+            sig = similarity.signature(file_info['path'], throttle=config.throttle)
+        except OSError as e:
+            print(f"Error processing {file_info['path']}: {str(e)}")
+            continue
+        if sig is not None:
+            signatures[i] = sig
+
+    if progress:
+        progress("", "Matching similar files", 0)
+    groups = []
+    clusters = similarity.find_similar(signatures, config.similarity_threshold)
+    clustered = {i for members, _ in clusters for i in members}
+    # Identical copies with nothing else similar still form a cluster
+    clusters += [([i], 1.0) for i in signatures if i not in clustered and len(copies[i]) > 1]
+    for members, score in clusters:
+        files = [index[j] for i in members for j in copies[i]]
+        if config.mode == 'single':
+            groups.append(DuplicateGroup(files=files, similarity=score))
+            continue
+        if config.mode == 'master':
+            masters = sorted((f for f in files if f['root'] == 0), key=lambda f: f['path'])
+            removable = [f for f in files if f['root'] == 1]
+            if not masters or not removable:
+                continue
+            files = [masters[0]] + removable
+        files.sort(key=lambda f: (f['root'], f['path']))
+        groups.append(DuplicateGroup(files=files, keeper=files[0], similarity=score))
+    emit(groups)
+
+
+def _search_directories(config: ScanConfig, result: SearchResult, progress, cancelled,
+                        emit, scan, hash_cache):
+    """
+    Search that reports identical directory trees as single entries.
+
+    Besides the usual size collisions, every file in a directory that may
+    have an identical copy is hashed; directory digests are then matched
+    like files, ignoring dates. Files inside the reported directories are
+    only listed in a file group if some copy lies outside them.
+    """
+    index = scan_roots(config, progress, cancelled, scan)
+    result.files_scanned = len(index)
+    quick_min_size = config.quick_min_size if config.quick else None
+    ruled_out = directories.impossible_directories(index)
+    wanted = {id(f): f for bucket in candidate_buckets(config, index) for f in bucket}
+    wanted.update((id(f), f) for f in index if os.path.dirname(f['path']) not in ruled_out)
+    hashed = _hash_files(config, list(wanted.values()), progress, cancelled,
+                         quick_min_size, hash_cache)
+    if cancelled():
+        return
+
+    if progress:
+        progress("", "Matching directories", 0)
+    entries = directories.directory_entries(index, config.roots)
+    directory_groups = directories.maximal_groups(
+        match_files(dataclasses.replace(config, match_date=False), entries))
+    emit(directory_groups)
+
+    collapsed = {f['path'] for group in directory_groups for f in group.files}
+    emit([group for group in match_files(config, hashed)
+          if not all(directories.inside(f['path'], collapsed) for f in group.files)])
+
+
+def _search_external(config: ScanConfig, result: SearchResult, progress, cancelled, emit):
+    """
+    Bounded-memory variant of the search pipeline.
+
+    (size, inode, path) records are spilled to sorted run files and merged to find
+    size collisions; the colliding files are hashed and (key, path) records
+    spilled and merged the same way, so only one collision group at a time
+    is held in memory. The directory walk is always sequential here.
+    """
+    limit = config.memory_limit_mb * 1024 * 1024
+    quick_min_size = config.quick_min_size if config.quick else None
+
+    with ExternalSorter(limit, config.temp_dir) as by_size, \
+            ExternalSorter(limit, config.temp_dir) as by_key:
+        for root_index, root in enumerate(config.roots):
+            if cancelled():
+                return
+            if progress:
+                progress(root, "Scanning directory", 0)
+            # Linked paths are collapsed by the sorted inode below; a set of
+            # every inode seen would break the memory bound
+            for f in scanner.iter_directory(root, config.recursive, cancelled,
+                                            config.throttle, config.follow_symlinks,
+                                            config.one_file_system, unique_files=False):
+                by_size.add((f['size'], f['inode'], root_index, f['path'], f['name'], f['date']))
+
+        pending = []
+
+        def flush():
+            for f in _hash_files(config, pending, progress, cancelled, quick_min_size):
+                by_key.add(duplicate_key(f, config.match_name, config.match_size,
+                                         config.name_matching) +
+                           (f['path'], f['root'], f['name'], f['size'], f['date'],
+                            f.get('sampled', False)))
+            pending.clear()
+
+        previous_inode = None
+        for _, run in itertools.groupby(by_size, key=lambda r: r[0]):
+            files = []
+            for size, inode, root_index, path, name, date in run:
+                # The same file reached from several roots sorts adjacently;
+                # keep it under the first root
+                if inode == previous_inode:
+                    continue
+                previous_inode = inode
+                files.append({'name': name, 'path': path, 'size': size,
+                              'date': date, 'root': root_index})
+            result.files_scanned += len(files)
+            if len(files) < 2:
+                continue
+            if config.mode == 'master' and len({f['root'] for f in files}) < 2:
+                continue
+            pending.extend(files)
+            if len(pending) >= HASH_BATCH_SIZE:
+                flush()
+            if cancelled():
+                return
+        flush()
+
+        if progress:
+            progress("", "Matching files", 0)
+        matcher = BucketMatcher(functools.partial(match_files, config), DuplicateGroup,
+                            emit, config.workers)
+        shard_size = HASH_BATCH_SIZE if config.workers != 1 else 1
+        shard = []
+        try:
+            for run in iter_runs(by_key, key=lambda r: r[:3]):
+                for digest, _, _, path, root_index, name, size, date, sampled in run:
+                    file_info = {'name': name, 'path': path, 'size': size, 'date': date,
+                                 'root': root_index, 'hash': digest}
+                    if sampled:
+                        file_info['sampled'] = True
+                    shard.append(file_info)
+                if len(shard) >= shard_size:
+                    matcher.submit(shard)
+                    shard = []
+                if cancelled():
+                    return
+            matcher.submit(shard)
+        finally:
+            matcher.close(cancel=cancelled())
+
+
+def _search_compact_master(config: ScanConfig, result: SearchResult, progress, cancelled, emit):
+    """
+    Master-mode pipeline that never holds the master files in memory.
+
+    The removable directory is scanned first. The master walk is then
+    streamed: only files whose size occurs on the removable side are
+    hashed, and they go into a MasterIndex rather than a list. Removable
+    files are finally hashed one batch of whole size buckets at a time and
+    looked up, so each keeper's group is complete when its batch is done.
+    """
+    master_root, removable_root = config.roots
+    quick_min_size = config.quick_min_size if config.quick else None
+    criteria = (config.match_name, config.match_size,
+                config.match_date, config.date_tolerance,
+                config.name_matching, config.name_distance)
+
+    if progress:
+        progress(removable_root, "Scanning directory", 0)
+    removable = {}  # inode -> file
+    for f in scanner.iter_directory(removable_root, config.recursive, cancelled,
+                                    config.throttle, config.follow_symlinks,
+                                    config.one_file_system):
+        f['root'] = 1
+        removable[f['inode']] = f
+    removable_sizes = {f['size'] for f in removable.values()}
+
+    with MasterIndex(config.match_name, config.master_capacity, config.temp_dir) as index:
+        if progress:
+            progress(master_root, "Scanning directory", 0)
+        master_sizes = set()
+        pending = []
+        # Not made unique by the walk: that would keep every master inode
+        for f in scanner.iter_directory(master_root, config.recursive, cancelled,
+                                        config.throttle, config.follow_symlinks,
+                                        config.one_file_system, unique_files=False):
+            result.files_scanned += 1
+            # A file reachable from both roots belongs to the master
+            removable.pop(f['inode'], None)
+            if f['size'] not in removable_sizes:
+                continue
+            f['root'] = 0
+            master_sizes.add(f['size'])
+            pending.append(f)
+            if len(pending) >= HASH_BATCH_SIZE:
+                index.add_all(_hash_files(config, pending, progress, cancelled, quick_min_size))
+                pending = []
+        index.add_all(_hash_files(config, pending, progress, cancelled, quick_min_size))
+        index.finalize()
+        result.files_scanned += len(removable)
+        if cancelled():
+            return
+
+        by_size = {}
+        for f in removable.values():
+            if f['size'] in master_sizes:
+                by_size.setdefault(f['size'], []).append(f)
+        del removable
+
+        batch = []
+        buckets = list(by_size.values())
+        for i, bucket in enumerate(buckets):
+            batch.extend(bucket)
+            if len(batch) < HASH_BATCH_SIZE and i < len(buckets) - 1:
+                continue
+            hashed = _hash_files(config, batch, progress, cancelled, quick_min_size)
+            if cancelled():
+                return
+            by_key = {}
+            for f in hashed:
+                by_key.setdefault(duplicate_key(f, config.match_name, config.match_size), []).append(f)
+            groups = []
+            for files in by_key.values():
+                masters = index.lookup(files[0])
+                if masters:
+                    groups.extend(find_in_master(masters, files, *criteria))
+            emit([DuplicateGroup(files=[g['keeper']] + g['redundant'], keeper=g['keeper'])
+                  for g in groups])
+            batch = []
+
+
+def verify_groups(result: SearchResult,
+                  progress: Optional[Callable[[str, str, int], None]] = None,
+                  cancelled: Optional[Callable[[], bool]] = None) -> SearchResult:
+    """
+    Promote probable groups to confirmed ones with a full hash.
+
+    The copies of every probable group are hashed in full and matched
+    again; copies that turn out to differ are dropped. If cancelled, the
+    result is left untouched.
+
+    Args:
+        result (SearchResult): Result of a quick search.
+        progress (Optional[Callable[[str, str, int], None]]): Progress callback.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+
+    Returns:
+        SearchResult: The same result, updated in place.
+    """
+    cancelled = cancelled or (lambda: False)
+    probable = [group for group in result.groups if group.status == PROBABLE]
+    if not probable:
+        return result
+
+    # Work on copies so a cancelled verification leaves the result as it was
+    files = [dict(f) for group in probable for f in group.files]
+    hashed = _hash_files(result.config, files, progress, cancelled, None)
+    if cancelled():
+        return result
+    confirmed = match_files(result.config, hashed)
+    result.groups = [g for g in result.groups if g.status == CONFIRMED] + confirmed
+    return result
@@ -0,0 +1,110 @@
+import heapq
+import itertools
+import os
+import pickle
+import tempfile
+from typing import Callable, Iterator, List, Optional, Tuple
+
+RECORD_OVERHEAD = 200
+
+
+def estimate_size(record: Tuple) -> int:
+    """
+    Roughly estimate the memory held by a record tuple.
+
+    Args:
+        record (Tuple): Record made of numbers, strings and datetimes.
+
+    Returns:
+        int: Estimated size in bytes.
+    """
+    return RECORD_OVERHEAD + sum(len(value) for value in record if isinstance(value, str))
+
+
+class ExternalSorter:
+    """
+    Sort more records than fit in memory.
+
+    Records are buffered until the memory budget is reached, then the
+    buffer is sorted and spilled to a temporary run file. Iterating merges
+    all runs with the remaining buffer.
+
+    Args:
+        memory_limit (int): Memory budget for buffered records, in bytes.
+        temp_dir (Optional[str]): Directory for run files.
+        key (Optional[Callable]): Sort key; records are compared directly
+            when None.
+    """
+
+    def __init__(self, memory_limit: int, temp_dir: Optional[str] = None,
+                 key: Optional[Callable] = None):
+        self.memory_limit = memory_limit
+        self.key = key
+        self._temp = tempfile.TemporaryDirectory(prefix='dupes-sort-', dir=temp_dir)
+        self._buffer = []
+        self._buffered = 0
+        self._runs: List[str] = []
+
+    def add(self, record: Tuple):
+        """Add a record, spilling the buffer to disk when it is full."""
+        self._buffer.append(record)
+        self._buffered += estimate_size(record)
+        if self._buffered >= self.memory_limit:
+            self._spill()
+
+    def _spill(self):
+        self._buffer.sort(key=self.key)
+        path = os.path.join(self._temp.name, f"run{len(self._runs)}")
+        with open(path, 'wb') as f:
+            for record in self._buffer:
+                pickle.dump(record, f, pickle.HIGHEST_PROTOCOL)
+        self._runs.append(path)
+        self._buffer = []
+        self._buffered = 0
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[Tuple]:
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    @property
+    def runs(self) -> int:
+        """Number of run files spilled so far."""
+        return len(self._runs)
+
+    def __iter__(self) -> Iterator[Tuple]:
+        self._buffer.sort(key=self.key)
+        streams = [self._read_run(path) for path in self._runs] + [iter(self._buffer)]
+        return heapq.merge(*streams, key=self.key)
+
+    def close(self):
+        """Delete the run files."""
+        self._buffer = []
+        self._temp.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_runs(records: Iterator[Tuple], key: Callable) -> Iterator[List[Tuple]]:
+    """
+    Group consecutive records of a sorted stream that share a key.
+
+    Args:
+        records (Iterator[Tuple]): Records sorted by key.
+        key (Callable): Function extracting the grouping key.
+
+    Yields:
+        List[Tuple]: Records with the same key, only when there are two or more.
+    """
+    for _, run in itertools.groupby(records, key=key):
+        run = list(run)
+        if len(run) > 1:
+            yield run
@@ -0,0 +1,191 @@
+import bisect
+from typing import Dict, List, Tuple
+
+from .names import DEFAULT_NAME_DISTANCE, NameIndex, fuzzy_clusters, normalize_name
+
+DEFAULT_DATE_TOLERANCE = 1.0
+
+def duplicate_key(file_info: Dict[str, any], match_name: bool = True,
+                  match_size: bool = True, name_mode: str = 'exact') -> Tuple:
+    """
+    Build the exact-match key of a file for the enabled criteria.
+    
+    Args:
+        file_info (Dict[str, any]): File information dictionary.
+        match_name (bool): Whether to match filenames.
+        match_size (bool): Whether to match file sizes.
+        name_mode (str): 'exact' keys on the name, 'normalized' on its
+            normalized form; 'fuzzy' leaves the name out of the key, since
+            similar names are matched inside each bucket instead.
+    
+    Returns:
+        Tuple: Hash, plus name and size when those criteria are enabled.
+    """
+    name = None
+    if match_name and name_mode == 'exact':
+        name = file_info['name']
+    elif match_name and name_mode == 'normalized':
+        name = normalize_name(file_info['name'])
+    return (file_info['hash'], name,
+            file_info['size'] if match_size else None)
+
+def sweep_by_date(files: List[Dict[str, any]],
+                  tolerance: float = DEFAULT_DATE_TOLERANCE) -> List[List[Dict[str, any]]]:
+    """
+    Split files into runs of modification dates within a tolerance.
+    
+    Files are sorted by date and a new run starts wherever the gap to the
+    previous file exceeds the tolerance, which yields the same clusters as
+    transitively joining every pair within the tolerance in O(n log n).
+    
+    Args:
+        files (List[Dict[str, any]]): List of file information dictionaries.
+        tolerance (float): Maximum gap in seconds between neighbouring dates.
+    
+    Returns:
+        List[List[Dict[str, any]]]: Runs of files, in date order.
+    """
+    ordered = sorted(files, key=lambda f: f['date'])
+    runs = []
+    previous = None
+    for file_info in ordered:
+        if previous is None or (file_info['date'] - previous).total_seconds() > tolerance:
+            runs.append([])
+        runs[-1].append(file_info)
+        previous = file_info['date']
+    return runs
+
+def group_duplicates(files: List[Dict[str, any]],
+                     match_name: bool = True,
+                     match_size: bool = True,
+                     match_date: bool = False,
+                     date_tolerance: float = DEFAULT_DATE_TOLERANCE,
+                     name_mode: str = 'exact',
+                     name_distance: int = DEFAULT_NAME_DISTANCE) -> List[List[Dict[str, any]]]:
+    """
+    Group files that are duplicates of each other.
+    
+    Files are bucketed by hash plus the enabled exact criteria; fuzzy
+    names and the date criterion are then applied inside each bucket,
+    with an n-gram name index and a sort-and-sweep respectively.
+    
+    Args:
+        files (List[Dict[str, any]]): List of file information dictionaries.
+        match_name (bool): Whether to match filenames.
+        match_size (bool): Whether to match file sizes.
+        match_date (bool): Whether to match modification dates.
+        date_tolerance (float): Seconds two dates may differ and still match.
+        name_mode (str): 'exact', 'normalized' or 'fuzzy' name matching.
+        name_distance (int): Edit distance allowed between fuzzy names.
+    
+    Returns:
+        List[List[Dict[str, any]]]: Groups of two or more duplicate files.
+    """
+    buckets = {}
+    for file_info in files:
+        buckets.setdefault(duplicate_key(file_info, match_name, match_size, name_mode),
+                           []).append(file_info)
+    bucket_list = list(buckets.values())
+    if match_name and name_mode == 'fuzzy':
+        bucket_list = [cluster for bucket in bucket_list if len(bucket) > 1
+                       for cluster in fuzzy_clusters(bucket, name_distance)]
+
+    groups = []
+    for bucket in bucket_list:
+        if len(bucket) < 2:
+            continue
+        if not match_date:
+            groups.append(bucket)
+            continue
+        groups.extend(run for run in sweep_by_date(bucket, date_tolerance) if len(run) > 1)
+    return groups
+
+def find_in_master(master_files: List[Dict[str, any]],
+                   removable_files: List[Dict[str, any]],
+                   match_name: bool = True,
+                   match_size: bool = True,
+                   match_date: bool = False,
+                   date_tolerance: float = DEFAULT_DATE_TOLERANCE,
+                   name_mode: str = 'exact',
+                   name_distance: int = DEFAULT_NAME_DISTANCE) -> List[Dict[str, any]]:
+    """
+    Find removable files that duplicate at least one master file.
+    
+    Master files are bucketed by exact key with their dates sorted, so the
+    date criterion is a binary search for the nearest master date. With
+    fuzzy names, each bucket is narrowed first to the masters whose names
+    an n-gram index finds close to the removable file's.
+    
+    Args:
+        master_files (List[Dict[str, any]]): Files of the master directory.
+        removable_files (List[Dict[str, any]]): Files of the removable directory.
+        match_name (bool): Whether to match filenames.
+        match_size (bool): Whether to match file sizes.
+        match_date (bool): Whether to match modification dates.
+        date_tolerance (float): Seconds two dates may differ and still match.
+        name_mode (str): 'exact', 'normalized' or 'fuzzy' name matching.
+        name_distance (int): Edit distance allowed between fuzzy names.
+    
+    Returns:
+        List[Dict[str, any]]: One dictionary per matched master file with:
+            - keeper: file information of the master copy
+            - redundant: list of removable copies of it
+    """
+    buckets = {}
+    for file_info in master_files:
+        buckets.setdefault(duplicate_key(file_info, match_name, match_size, name_mode),
+                           []).append(file_info)
+    dates = {}
+    for key, bucket in buckets.items():
+        bucket.sort(key=lambda f: (f['date'], f['path']))
+        dates[key] = [f['date'] for f in bucket]
+    fuzzy = match_name and name_mode == 'fuzzy'
+    indexes = {}
+
+    groups = {}
+    for file_info in removable_files:
+        key = duplicate_key(file_info, match_name, match_size, name_mode)
+        bucket = buckets.get(key)
+        if not bucket:
+            continue
+        if fuzzy:
+            if key not in indexes:
+                indexes[key] = NameIndex(name_distance)
+                for master in bucket:
+                    indexes[key].add(normalize_name(master['name']))
+            # Positions follow the bucket's date order
+            bucket = [bucket[i] for i in sorted(indexes[key].search(normalize_name(file_info['name'])))]
+            if not bucket:
+                continue
+        keeper = bucket[0]
+        if match_date:
+            i = bisect.bisect_left([f['date'] for f in bucket] if fuzzy else dates[key],
+                                   file_info['date'])
+            nearest = [bucket[j] for j in (i - 1, i) if 0 <= j < len(bucket)]
+            keeper = min(nearest, key=lambda f: abs((f['date'] - file_info['date']).total_seconds()))
+            if abs((keeper['date'] - file_info['date']).total_seconds()) > date_tolerance:
+                continue
+        groups.setdefault(id(keeper), {'keeper': keeper, 'redundant': []})['redundant'].append(file_info)
+    return list(groups.values())
+
+def assign_keepers(groups: List[List[Dict[str, any]]]) -> List[Dict[str, any]]:
+    """
+    Choose the copy to keep in each duplicate group.
+    
+    The keeper is the copy in the root with the highest priority (lowest
+    'root' index), ties broken by path; every other copy is redundant.
+    
+    Args:
+        groups (List[List[Dict[str, any]]]): Duplicate groups whose files
+            carry a 'root' index.
+    
+    Returns:
+        List[Dict[str, any]]: One dictionary per group with:
+            - keeper: file information of the copy to keep
+            - redundant: list of file information of the other copies
+    """
+    result = []
+    for group in groups:
+        ordered = sorted(group, key=lambda f: (f['root'], f['path']))
+        result.append({'keeper': ordered[0], 'redundant': ordered[1:]})
+    return result
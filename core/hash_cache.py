@@ -0,0 +1,50 @@
+import threading
+from typing import Dict, List, Optional
+
+
+class HashCache:
+    """
+    Remember file hashes between searches.
+
+    Entries are keyed by path and kind of hash (full or sampled) and only
+    reused while the file keeps the size and modification date it had when
+    it was hashed, so a changed file is always hashed again.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def fill(self, file_info: Dict, quick_min_size: Optional[int] = None) -> bool:
+        """
+        Set the hash of a file from the cache.
+
+        Args:
+            file_info (Dict): Scanned file.
+            quick_min_size (Optional[int]): Size from which a sampled hash
+                is wanted, as in scanner.hash_files.
+
+        Returns:
+            bool: True if the hash was found and set.
+        """
+        sampled = quick_min_size is not None and file_info['size'] >= quick_min_size
+        with self._lock:
+            entry = self._entries.get((file_info['path'], sampled))
+        if entry is None or entry[:2] != (file_info['size'], file_info['date']):
+            return False
+        file_info['hash'] = entry[2]
+        if sampled:
+            file_info['sampled'] = True
+        else:
+            file_info.pop('sampled', None)
+        return True
+
+    def update(self, files: List[Dict]):
+        """Store the hashes of freshly hashed files."""
+        with self._lock:
+            for f in files:
+                key = (f['path'], bool(f.get('sampled')))
+                self._entries[key] = (f['size'], f['date'], f['hash'])
+
+    def __len__(self) -> int:
+        return len(self._entries)
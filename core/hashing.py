@@ -0,0 +1,145 @@
+import hashlib
+import mmap
+import os
+from typing import Optional
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 64 * 1024 * 1024
+DEFAULT_SAMPLES = 16
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+
+def choose_chunk_size(file_size: int, block_size: int = 0) -> int:
+    """
+    Pick a read size for a file.
+
+    Small files are read in one call; larger ones use the biggest chunk up
+    to 1MB, rounded to the filesystem block size.
+
+    Args:
+        file_size (int): Size of the file in bytes.
+        block_size (int): Preferred I/O block size (st_blksize), if known.
+
+    Returns:
+        int: Chunk size in bytes.
+    """
+    chunk_size = max(MIN_CHUNK_SIZE, min(file_size, MAX_CHUNK_SIZE))
+    if block_size > 0:
+        chunk_size = max(block_size, chunk_size - chunk_size % block_size)
+    return chunk_size
+
+
+def _fadvise(fd: int, advice_name: str):
+    """Give the kernel a caching hint where posix_fadvise is available."""
+    advice = getattr(os, advice_name, None)
+    if advice is None or not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, advice)
+    except OSError:
+        pass
+
+
+def get_file_hash(filepath: str, chunk_size: Optional[int] = None,
+                  use_mmap: bool = True, throttle=None) -> str:
+    """
+    Calculate MD5 hash of a file.
+
+    Reads go into one reusable buffer (readinto plus memoryview) so no new
+    bytes object is allocated per chunk, and files of 64MB or more are
+    memory-mapped instead. The kernel is told the access is sequential and
+    that the pages can be dropped afterwards, so a scan does not evict the
+    page cache of other workloads.
+
+    Args:
+        filepath (str): Path to the file to hash.
+        chunk_size (Optional[int]): Size of chunks to read; chosen from the
+            file size and block size when None.
+        use_mmap (bool): Whether large files may be memory-mapped.
+        throttle (Optional[Throttle]): I/O and CPU limits applied to each
+            chunk read.
+
+    Returns:
+        str: Hexadecimal representation of the file's MD5 hash.
+
+    Raises:
+        OSError: If there are problems reading the file.
+        PermissionError: If there are permission issues accessing the file.
+    """
+    hasher = hashlib.md5()
+    with open(filepath, 'rb', buffering=0) as f:
+        fd = f.fileno()
+        stat = os.fstat(fd)
+        if chunk_size is None:
+            chunk_size = choose_chunk_size(stat.st_size, getattr(stat, 'st_blksize', 0))
+        _fadvise(fd, 'POSIX_FADV_SEQUENTIAL')
+        try:
+            if use_mmap and stat.st_size >= MMAP_THRESHOLD:
+                _hash_mmap(hasher, fd, stat.st_size, chunk_size, throttle)
+            else:
+                buf = bytearray(chunk_size)
+                with memoryview(buf) as view:
+                    n = f.readinto(buf)
+                    while n:
+                        if throttle:
+                            throttle.read(n)
+                        hasher.update(view[:n])
+                        n = f.readinto(buf)
+        finally:
+            _fadvise(fd, 'POSIX_FADV_DONTNEED')
+    return hasher.hexdigest()
+
+
+def _hash_mmap(hasher, fd: int, size: int, chunk_size: int, throttle=None):
+    """Feed a memory-mapped file to the hasher without copying it."""
+    with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        with memoryview(mapped) as view:
+            for offset in range(0, size, chunk_size):
+                # Pages are read as the hasher touches them
+                if throttle:
+                    throttle.read(min(chunk_size, size - offset))
+                hasher.update(view[offset:offset + chunk_size])
+
+
+def get_sample_hash(filepath: str, samples: int = DEFAULT_SAMPLES,
+                    block_size: int = SAMPLE_BLOCK_SIZE, throttle=None) -> str:
+    """
+    Calculate an MD5 hash over the size and evenly spaced blocks of a file.
+
+    Only samples * block_size bytes are read, whatever the file size, so
+    the digest is cheap for multi-GB files. Equal digests mean the files
+    are probably, not certainly, identical.
+
+    Args:
+        filepath (str): Path to the file to hash.
+        samples (int): Number of blocks to read, including the first and
+            the last block of the file.
+        block_size (int): Size of each block in bytes.
+        throttle (Optional[Throttle]): I/O and CPU limits applied to each
+            block read.
+
+    Returns:
+        str: Hexadecimal MD5 digest of the size and the sampled blocks.
+
+    Raises:
+        OSError: If there are problems reading the file.
+    """
+    hasher = hashlib.md5()
+    buf = bytearray(block_size)
+    with open(filepath, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        hasher.update(str(size).encode())
+        last = max(size - block_size, 0)
+        offsets = sorted({last * i // max(samples - 1, 1) for i in range(samples)})
+        with memoryview(buf) as view:
+            for offset in offsets:
+                if throttle:
+                    throttle.read(block_size)
+                f.seek(offset)
+                n = f.readinto(buf)
+                hasher.update(view[:n])
+        _fadvise(f.fileno(), 'POSIX_FADV_DONTNEED')
+    return hasher.hexdigest()
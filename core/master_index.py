@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from .bloom import BloomFilter
+
+DEFAULT_CAPACITY = 10_000_000
+INSERT_BATCH_SIZE = 10_000
+
+
+class MasterIndex:
+    """
+    Compact index of master files answering "is this in master?".
+
+    Keys (size, digest and, when names are matched, the name) go into a
+    Bloom filter of fixed size held in memory. The full records live in an
+    SQLite database on disk, consulted only when the filter reports a
+    possible match, so memory stays small and predictable however many
+    files the master side has.
+
+    Args:
+        match_name (bool): Whether the name is part of the key.
+        capacity (int): Expected number of master files for the filter.
+        temp_dir (Optional[str]): Directory for the database file.
+    """
+
+    def __init__(self, match_name: bool = True, capacity: int = DEFAULT_CAPACITY,
+                 temp_dir: Optional[str] = None):
+        self.match_name = match_name
+        self.filter = BloomFilter(capacity)
+        self._temp = tempfile.TemporaryDirectory(prefix='dupes-master-', dir=temp_dir)
+        self.db = sqlite3.connect(os.path.join(self._temp.name, 'master.db'),
+                                  check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=OFF')
+        self.db.execute('PRAGMA synchronous=OFF')
+        self.db.execute('CREATE TABLE master (digest TEXT, size INTEGER, name TEXT, '
+                        'date TEXT, path TEXT, sampled INTEGER)')
+        self._pending = []
+
+    def _key(self, digest: str, size: int, name: str) -> bytes:
+        key = f"{size}:{digest}"
+        if self.match_name:
+            key += f":{name}"
+        return key.encode('utf-8', 'surrogateescape')
+
+    def add(self, file_info: Dict):
+        """Add a hashed master file."""
+        self.filter.add(self._key(file_info['hash'], file_info['size'], file_info['name']))
+        self._pending.append((file_info['hash'], file_info['size'], file_info['name'],
+                              file_info['date'].isoformat(), file_info['path'],
+                              int(bool(file_info.get('sampled')))))
+        if len(self._pending) >= INSERT_BATCH_SIZE:
+            self.flush()
+
+    def add_all(self, files: Iterable[Dict]):
+        """Add several hashed master files."""
+        for file_info in files:
+            self.add(file_info)
+
+    def flush(self):
+        """Write pending records to the database."""
+        if self._pending:
+            self.db.executemany('INSERT INTO master VALUES (?, ?, ?, ?, ?, ?)', self._pending)
+            self._pending = []
+
+    def finalize(self):
+        """Flush and index the database; call once every master file is added."""
+        self.flush()
+        self.db.execute('CREATE INDEX master_key ON master (digest, size)')
+        self.db.commit()
+
+    def lookup(self, file_info: Dict) -> List[Dict]:
+        """
+        Find the master files with the same key as a hashed file.
+
+        Args:
+            file_info (Dict): Hashed file to look up.
+
+        Returns:
+            List[Dict]: Matching master files (root 0); empty when the
+                filter rules the key out without touching the disk.
+        """
+        if self._key(file_info['hash'], file_info['size'], file_info['name']) not in self.filter:
+            return []
+        query = 'SELECT name, path, size, date, digest, sampled FROM master WHERE digest = ? AND size = ?'
+        params = [file_info['hash'], file_info['size']]
+        if self.match_name:
+            query += ' AND name = ?'
+            params.append(file_info['name'])
+        matches = []
+        for name, path, size, date, digest, sampled in self.db.execute(query, params):
+            master = {'name': name, 'path': path, 'size': size,
+                      'date': datetime.fromisoformat(date), 'hash': digest, 'root': 0}
+            if sampled:
+                master['sampled'] = True
+            matches.append(master)
+        return matches
+
+    def close(self):
+        """Delete the database."""
+        self.db.close()
+        self._temp.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,164 @@
+import os
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+NAME_MODES = ('exact', 'normalized', 'fuzzy')
+DEFAULT_NAME_DISTANCE = 2
+NGRAM_SIZE = 3
+
+# Copy markers added by file managers, applied to the name without extension
+_COPY_PREFIXES = re.compile(r'^copy(?: \(\d+\))? of\s+')
+_COPY_SUFFIXES = re.compile(r'(?:\s*\(\d+\)|\s*-\s*copy(?:\s*\(\d+\))?|\s+copy(?:\s+\d+)?)$')
+
+
+def normalize_name(name: str) -> str:
+    """
+    Reduce a filename to a key shared by its renamed copies.
+
+    The name is NFKC-normalized and case-folded, copy markers such as
+    "Copy of x", "x (1)", "x - Copy" and "x copy 2" are removed, and runs
+    of whitespace are collapsed. The extension is kept.
+
+    Args:
+        name (str): Filename.
+
+    Returns:
+        str: Normalized name.
+    """
+    name = ' '.join(unicodedata.normalize('NFKC', name).casefold().split())
+    original, extension = os.path.splitext(name)
+    stem, previous = original, None
+    while stem != previous:
+        previous = stem
+        stem = _COPY_SUFFIXES.sub('', _COPY_PREFIXES.sub('', stem)).strip()
+    # A name that is nothing but a copy marker is kept as it is
+    return (stem or original) + extension
+
+
+def edit_distance(first: str, second: str, limit: Optional[int] = None) -> int:
+    """
+    Levenshtein distance between two strings.
+
+    Args:
+        first (str): First string.
+        second (str): Second string.
+        limit (Optional[int]): Stop early once the distance must exceed it.
+
+    Returns:
+        int: The distance, or limit + 1 if it exceeds the limit.
+    """
+    if len(first) < len(second):
+        first, second = second, first
+    if limit is not None and len(first) - len(second) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for i, a in enumerate(first, 1):
+        current = [i]
+        for j, b in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _ngrams(name: str) -> set:
+    padded = '\0' * (NGRAM_SIZE - 1) + name + '\0' * (NGRAM_SIZE - 1)
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+class NameIndex:
+    """
+    Find names within an edit distance without comparing every pair.
+
+    Names are indexed by their character trigrams. An edit changes at
+    most NGRAM_SIZE trigrams, so names within max_distance edits share at
+    least the trigram count minus NGRAM_SIZE * max_distance; only names
+    passing that filter, and whose lengths differ by max_distance at most,
+    get an exact edit-distance check.
+
+    Args:
+        max_distance (int): Largest edit distance accepted.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_NAME_DISTANCE):
+        self.max_distance = max_distance
+        self.names: List[str] = []
+        self._grams: List[set] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._by_length: Dict[int, List[int]] = {}
+
+    def add(self, name: str) -> int:
+        """Index a name; returns its position."""
+        position = len(self.names)
+        grams = _ngrams(name)
+        self.names.append(name)
+        self._grams.append(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(position)
+        self._by_length.setdefault(len(name), []).append(position)
+        return position
+
+    def search(self, name: str) -> List[int]:
+        """
+        Find the indexed names within max_distance edits of a name.
+
+        Returns:
+            List[int]: Positions of the matching names.
+        """
+        grams = _ngrams(name)
+        slack = NGRAM_SIZE * self.max_distance
+        if len(grams) - slack > 0:
+            shared = {}
+            for gram in grams:
+                for position in self._postings.get(gram, ()):
+                    shared[position] = shared.get(position, 0) + 1
+            candidates = [p for p, count in shared.items()
+                          if count >= max(len(grams), len(self._grams[p])) - slack]
+        else:
+            # Too short for the trigram filter: fall back to the length filter
+            candidates = [p for length in range(len(name) - self.max_distance,
+                                                len(name) + self.max_distance + 1)
+                          for p in self._by_length.get(length, ())]
+        return [p for p in candidates
+                if abs(len(self.names[p]) - len(name)) <= self.max_distance and
+                edit_distance(self.names[p], name, self.max_distance) <= self.max_distance]
+
+
+def fuzzy_clusters(files: List[Dict], max_distance: int = DEFAULT_NAME_DISTANCE) -> List[List[Dict]]:
+    """
+    Split files into clusters of similar normalized names.
+
+    Names within max_distance edits are linked, and clusters are the
+    connected groups of links.
+
+    Args:
+        files (List[Dict]): File information dictionaries.
+        max_distance (int): Largest edit distance between linked names.
+
+    Returns:
+        List[List[Dict]]: Every file in exactly one cluster.
+    """
+    by_name = {}
+    for f in files:
+        by_name.setdefault(normalize_name(f['name']), []).append(f)
+    names = list(by_name)
+    parent = list(range(len(names)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index = NameIndex(max_distance)
+    for i, name in enumerate(names):
+        for j in index.search(name):
+            parent[find(j)] = find(i)
+        index.add(name)
+
+    clusters = {}
+    for i, name in enumerate(names):
+        clusters.setdefault(find(i), []).extend(by_name[name])
+    return list(clusters.values())
@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def default_workers() -> int:
+    """Number of worker processes to use when not configured."""
+    return os.cpu_count() or 1
+
+
+def _match_shard(match: Callable[[List[Dict]], List], files: List[Dict]) -> List[Tuple]:
+    """
+    Match a shard in a worker process.
+
+    Only (keeper index, file indices) pairs are sent back, so results cost
+    little to transfer and refer to the caller's own file dictionaries.
+    """
+    position = {id(f): i for i, f in enumerate(files)}
+    return [
+        (position[id(group.keeper)] if group.keeper is not None else None,
+         [position[id(f)] for f in group.files])
+        for group in match(files)
+    ]
+
+
+class BucketMatcher:
+    """
+    Match hashed size buckets, inline or sharded across a process pool.
+
+    Every submitted shard holds whole size buckets, and files of different
+    sizes can never be duplicates, so shards are matched independently and
+    their groups simply concatenated.
+
+    Args:
+        match (Callable[[List[Dict]], List]): Picklable function turning
+            hashed files into groups with 'files' and 'keeper' attributes.
+        group_factory (Callable): Builds a group from files and keeper in
+            the calling process.
+        emit (Callable[[List], None]): Receives the groups of each shard,
+            in the calling thread.
+        workers (int): Worker processes; 1 matches inline and 0 or less
+            uses one per CPU.
+        max_pending (Optional[int]): Shards in flight before submit blocks;
+            defaults to twice the number of workers.
+    """
+
+    def __init__(self, match: Callable[[List[Dict]], List], group_factory: Callable,
+                 emit: Callable[[List], None], workers: int = 1,
+                 max_pending: Optional[int] = None):
+        self.match = match
+        self.group_factory = group_factory
+        self.emit = emit
+        if workers <= 0:
+            workers = default_workers()
+        self.pool = ProcessPoolExecutor(workers) if workers > 1 else None
+        self.max_pending = max_pending or 2 * workers
+        self.pending = {}
+
+    def submit(self, files: List[Dict]):
+        """Match a shard of hashed files made of complete size buckets."""
+        if not files:
+            return
+        if self.pool is None:
+            self.emit(self.match(files))
+            return
+        future = self.pool.submit(_match_shard, self.match, files)
+        self.pending[future] = files
+        self._collect(block=len(self.pending) >= self.max_pending)
+
+    def _collect(self, block: bool):
+        done, _ = wait(self.pending, timeout=None if block else 0,
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            files = self.pending.pop(future)
+            self.emit([
+                self.group_factory(files=[files[i] for i in indices],
+                                   keeper=files[keeper] if keeper is not None else None)
+                for keeper, indices in future.result()
+            ])
+
+    def close(self, cancel: bool = False):
+        """Wait for the shards in flight, or drop them when cancelling."""
+        if self.pool is None:
+            return
+        if cancel:
+            for future in self.pending:
+                future.cancel()
+        else:
+            while self.pending:
+                self._collect(block=True)
+        self.pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        self.close(cancel=exc_type is not None)
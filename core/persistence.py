@@ -0,0 +1,291 @@
+import gzip
+import json
+import os
+from dataclasses import asdict, fields, replace
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+from .engine import DuplicateGroup, ScanConfig, SearchResult
+from .shards import PartialIndex
+
+FORMAT_VERSION = 1
+RESULT_EXTENSION = '.dupes.json.gz'
+INDEX_EXTENSION = '.shard.json.gz'
+
+_FILE_KEYS = ('name', 'path', 'size', 'hash', 'root', 'sampled', 'directory', 'file_count',
+              'archive', 'member', 'archive_mtime')
+
+
+def _encode_file(file_info: Dict) -> Dict:
+    record = {key: file_info[key] for key in _FILE_KEYS if key in file_info}
+    record['date'] = file_info['date'].isoformat()
+    return record
+
+
+def _decode_file(record: Dict) -> Dict:
+    file_info = dict(record)
+    file_info['date'] = datetime.fromisoformat(record['date'])
+    return file_info
+
+
+def _decode_config(data: Dict) -> ScanConfig:
+    # Files written by another version may lack or add settings
+    if not isinstance(data, dict):
+        raise ValueError("Saved settings are missing")
+    unknown = data.keys() - {f.name for f in fields(ScanConfig)}
+    if unknown:
+        raise ValueError(f"Saved by another version, with unknown settings: "
+                         f"{', '.join(sorted(unknown))}")
+    try:
+        return ScanConfig(**data)
+    except TypeError as e:
+        raise ValueError(f"Saved by another version: {e}") from None
+
+
+def encode_group(group: DuplicateGroup) -> Dict:
+    """Convert a group to JSON-compatible data, the keeper as a file index."""
+    keeper = None
+    if group.keeper is not None:
+        keeper = next(i for i, f in enumerate(group.files) if f is group.keeper)
+    data = {'keeper': keeper, 'files': [_encode_file(f) for f in group.files]}
+    if group.similarity is not None:
+        data['similarity'] = group.similarity
+    return data
+
+
+def decode_group(data: Dict) -> DuplicateGroup:
+    """Rebuild a group converted by encode_group."""
+    files = [_decode_file(record) for record in data['files']]
+    keeper = files[data['keeper']] if data['keeper'] is not None else None
+    return DuplicateGroup(files=files, keeper=keeper, similarity=data.get('similarity'))
+
+
+def encode_result(result: SearchResult) -> Dict:
+    """
+    Convert a search result to JSON-compatible data.
+
+    Args:
+        result (SearchResult): Result to convert.
+
+    Returns:
+        Dict: Data with the format version, settings, timing and groups.
+    """
+    return {
+        'format': FORMAT_VERSION,
+        'config': asdict(result.config),
+        'started': result.started.isoformat(),
+        'finished': result.finished.isoformat() if result.finished else None,
+        'files_scanned': result.files_scanned,
+        'cancelled': result.cancelled,
+        'budget_exhausted': result.budget_exhausted,
+        'groups': [encode_group(group) for group in result.groups],
+    }
+
+
+def decode_result(data: Dict) -> SearchResult:
+    """
+    Rebuild a search result converted by encode_result.
+
+    Args:
+        data (Dict): Converted result.
+
+    Returns:
+        SearchResult: The result.
+
+    Raises:
+        ValueError: If the data is not a converted result.
+    """
+    if not isinstance(data, dict) or data.get('format') != FORMAT_VERSION:
+        raise ValueError("Not a saved result")
+    return SearchResult(
+        config=_decode_config(data.get('config')),
+        groups=[decode_group(group) for group in data['groups']],
+        files_scanned=data['files_scanned'],
+        started=datetime.fromisoformat(data['started']),
+        finished=datetime.fromisoformat(data['finished']) if data['finished'] else None,
+        cancelled=data['cancelled'],
+        budget_exhausted=data.get('budget_exhausted', False),
+    )
+
+
+def save_result(result: SearchResult, filepath: str):
+    """
+    Save a search result to a gzip-compressed JSON file.
+
+    Args:
+        result (SearchResult): Result to save.
+        filepath (str): Destination file.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    _save_json(encode_result(result), filepath)
+
+
+def load_result(filepath: str) -> SearchResult:
+    """
+    Load a search result saved by save_result, without touching the files.
+
+    Args:
+        filepath (str): File to read.
+
+    Returns:
+        SearchResult: The saved result; use iter_valid_groups to drop the
+            copies that changed since the scan.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the file is not a saved result.
+    """
+    data = _load_json(filepath)
+    try:
+        return decode_result(data)
+    except ValueError:
+        raise ValueError(f"Not a saved result: {filepath}") from None
+
+
+def _save_json(data: Dict, filepath: str):
+    tmp_path = filepath + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, filepath)
+
+
+def _load_json(filepath: str) -> Dict:
+    with gzip.open(filepath, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def encode_index(index: PartialIndex) -> Dict:
+    """
+    Convert a partial index to JSON-compatible data.
+
+    Files are stored like the files of a saved result, so the index can be
+    merged on any machine.
+
+    Args:
+        index (PartialIndex): Index to convert.
+
+    Returns:
+        Dict: Data with the format version, host, settings, timing and files.
+    """
+    return {
+        'format': FORMAT_VERSION,
+        'kind': 'partial-index',
+        'host': index.host,
+        'config': asdict(index.config),
+        'started': index.started.isoformat(),
+        'finished': index.finished.isoformat() if index.finished else None,
+        'cancelled': index.cancelled,
+        'files': [_encode_file(f) for f in index.files],
+    }
+
+
+def decode_index(data: Dict) -> PartialIndex:
+    """
+    Rebuild a partial index converted by encode_index.
+
+    Raises:
+        ValueError: If the data is not a converted index.
+    """
+    if (not isinstance(data, dict) or data.get('format') != FORMAT_VERSION or
+            data.get('kind') != 'partial-index'):
+        raise ValueError("Not a partial index")
+    return PartialIndex(
+        config=_decode_config(data.get('config')),
+        host=data['host'],
+        files=[_decode_file(record) for record in data['files']],
+        started=datetime.fromisoformat(data['started']),
+        finished=datetime.fromisoformat(data['finished']) if data['finished'] else None,
+        cancelled=data['cancelled'],
+    )
+
+
+def save_index(index: PartialIndex, filepath: str):
+    """
+    Save a partial index to a gzip-compressed JSON file.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    _save_json(encode_index(index), filepath)
+
+
+def load_index(filepath: str) -> PartialIndex:
+    """
+    Load a partial index saved by save_index.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the file is not a partial index.
+    """
+    data = _load_json(filepath)
+    try:
+        return decode_index(data)
+    except ValueError:
+        raise ValueError(f"Not a partial index: {filepath}") from None
+
+
+def is_unchanged(file_info: Dict) -> bool:
+    """
+    Check with a single stat that a file still matches its scan record.
+
+    Args:
+        file_info (Dict): File information from a search result.
+
+    Returns:
+        bool: True if the file exists with the recorded size and date;
+            for a directory entry, only that the directory still exists,
+            and for an archive member that the archive was not modified.
+    """
+    if file_info.get('directory'):
+        return os.path.isdir(file_info['path'])
+    if 'member' in file_info:
+        try:
+            return os.stat(file_info['archive']).st_mtime == file_info['archive_mtime']
+        except OSError:
+            return False
+    try:
+        stat = os.stat(file_info['path'])
+    except OSError:
+        return False
+    return (stat.st_size == file_info['size'] and
+            datetime.fromtimestamp(stat.st_mtime) == file_info['date'])
+
+
+def revalidate_group(group: DuplicateGroup) -> Optional[DuplicateGroup]:
+    """
+    Drop the copies of a group that changed or disappeared.
+
+    Args:
+        group (DuplicateGroup): Group from a loaded result.
+
+    Returns:
+        Optional[DuplicateGroup]: The remaining copies, or None when fewer
+            than two are left or the keeper itself changed.
+    """
+    if group.keeper is not None and not is_unchanged(group.keeper):
+        return None
+    files = [f for f in group.files if f is group.keeper or is_unchanged(f)]
+    if len(files) < 2:
+        return None
+    return replace(group, files=files)
+
+
+def iter_valid_groups(result: SearchResult) -> Iterator[DuplicateGroup]:
+    """
+    Lazily revalidate the groups of a loaded result.
+
+    Files are only stat'ed when their group is reached, so a front-end can
+    display the first groups straight away.
+
+    Args:
+        result (SearchResult): Loaded result.
+
+    Yields:
+        DuplicateGroup: Groups that are still valid, with changed copies removed.
+    """
+    for group in result.groups:
+        valid = revalidate_group(group)
+        if valid is not None:
+            yield valid
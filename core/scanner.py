@@ -0,0 +1,207 @@
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .hashing import get_file_hash, get_sample_hash
+
+
+def _file_record(path: str, stat) -> Dict:
+    return {
+        'name': os.path.basename(path),
+        'path': path,
+        'size': stat.st_size,
+        'date': datetime.fromtimestamp(stat.st_mtime),
+        'inode': (stat.st_dev, stat.st_ino),
+    }
+
+
+def get_file_info(filepath: str, with_hash: bool = True, resolve: bool = True) -> Dict:
+    """
+    Get file information.
+
+    Args:
+        filepath (str): Path to the file.
+        with_hash (bool): Whether to hash the file contents as well.
+        resolve (bool): Whether to resolve symlinks in the path; otherwise
+            the path is only made absolute, as a walk found it.
+
+    Returns:
+        Dict: Dictionary containing file information:
+            - name: filename
+            - path: full path, resolved unless resolve is off
+            - size: size in bytes
+            - date: modification datetime
+            - inode: (st_dev, st_ino), shared by every path to the file
+            - hash: MD5 hash (only when with_hash is set)
+
+    Raises:
+        OSError: If there are problems accessing the file.
+    """
+    path = Path(filepath).resolve() if resolve else Path(os.path.abspath(filepath))
+    file_info = _file_record(str(path), path.stat())
+    if with_hash:
+        file_info['hash'] = get_file_hash(str(path))
+    return file_info
+
+
+def iter_directory(directory: str, recursive: bool = True,
+                   cancelled: Optional[Callable[[], bool]] = None,
+                   throttle=None, follow_symlinks: bool = False,
+                   one_file_system: bool = False, unique_files: bool = True) -> Iterator[Dict]:
+    """
+    Yield information about every file in a directory, without hashing.
+
+    Directories are remembered by (st_dev, st_ino), so one reachable
+    through several paths (symlinks, bind mounts) is walked only once, and
+    files are remembered the same way, so hardlinks and symlinks to one
+    file yield a single record. The walk is depth-first with the entries
+    of each directory in name order, files and subdirectories together,
+    so the path kept is the first one compared component by component;
+    core.async_scanner keeps the same one. Without unique_files, every
+    path to a file yields a record.
+
+    Args:
+        directory (str): Directory to scan.
+        recursive (bool): Whether to descend into subdirectories.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+        throttle (Optional[Throttle]): Limits applied to each entry stat'ed.
+        follow_symlinks (bool): Whether symlinks to files and directories
+            are followed; otherwise they are skipped. Followed files are
+            recorded under the path found in the walk, inside the directory.
+        one_file_system (bool): Whether to skip directories on other
+            filesystems than the directory scanned.
+        unique_files (bool): Whether files reached by several paths yield
+            a single record. This remembers every file walked, so callers
+            bounded in memory pass False and collapse links by inode.
+
+    Yields:
+        Dict: File information, in directory walk order.
+
+    Raises:
+        OSError: If the directory cannot be accessed.
+    """
+    cancelled = cancelled or (lambda: False)
+    dir_path = Path(directory).resolve()
+    if not dir_path.is_dir():
+        raise NotADirectoryError(f"Not a directory: {directory}")
+
+    def listing(path: str) -> Iterator[os.DirEntry]:
+        if throttle:
+            throttle.operation()
+        with os.scandir(path) as it:
+            return iter(sorted(it, key=lambda entry: entry.name))
+
+    root_stat = dir_path.stat()
+    device = root_stat.st_dev
+    visited = {(device, root_stat.st_ino)}
+    seen = set()
+    pending = [listing(str(dir_path))]
+    while pending:
+        entry = next(pending[-1], None)
+        if entry is None:
+            pending.pop()
+            continue
+        if cancelled():
+            return
+        try:
+            if entry.is_dir(follow_symlinks=follow_symlinks):
+                if not recursive:
+                    continue
+                stat = entry.stat(follow_symlinks=follow_symlinks)
+                key = (stat.st_dev, stat.st_ino)
+                if key in visited or (one_file_system and stat.st_dev != device):
+                    continue
+                visited.add(key)
+                try:
+                    pending.append(listing(entry.path))
+                except OSError as e:
+                    print(f"Error accessing directory {entry.path}: {str(e)}")
+            elif entry.is_file(follow_symlinks=follow_symlinks):
+                if throttle:
+                    throttle.operation()
+                stat = entry.stat(follow_symlinks=follow_symlinks)
+                if unique_files:
+                    if (stat.st_dev, stat.st_ino) in seen:
+                        continue
+                    seen.add((stat.st_dev, stat.st_ino))
+                yield _file_record(entry.path, stat)
+        except (OSError, PermissionError) as e:
+            # Log the error but continue processing
+            print(f"Error processing {entry.path}: {str(e)}")
+
+
+def scan_directory(directory: str, recursive: bool = True,
+                   cancelled: Optional[Callable[[], bool]] = None,
+                   throttle=None, follow_symlinks: bool = False,
+                   one_file_system: bool = False) -> List[Dict]:
+    """
+    Collect information about every file in a directory, without hashing.
+
+    Args:
+        directory (str): Directory to scan.
+        recursive (bool): Whether to descend into subdirectories.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+        throttle (Optional[Throttle]): Limits applied to each entry stat'ed.
+        follow_symlinks (bool): Whether symlinks are followed.
+        one_file_system (bool): Whether to stay on the directory's filesystem.
+
+    Returns:
+        List[Dict]: File information dictionaries sorted by path, one per
+            file however many paths lead to it.
+
+    Raises:
+        OSError: If the directory cannot be accessed.
+    """
+    return sorted(iter_directory(directory, recursive, cancelled, throttle,
+                                 follow_symlinks, one_file_system),
+                  key=lambda f: f['path'])
+
+
+def hash_files(files: List[Dict],
+               progress: Optional[Callable[[str, str, int], None]] = None,
+               cancelled: Optional[Callable[[], bool]] = None,
+               chunk_size: Optional[int] = None,
+               use_mmap: bool = True,
+               quick_min_size: Optional[int] = None,
+               throttle=None) -> List[Dict]:
+    """
+    Add the content hash to each file information dictionary.
+
+    Files of quick_min_size bytes or more get a sampled hash instead and
+    are flagged 'sampled'.
+
+    Args:
+        files (List[Dict]): Files to hash.
+        progress (Optional[Callable[[str, str, int], None]]): Called with
+            folder, filename and the number of files hashed so far.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+        chunk_size (Optional[int]): Read size; chosen per file when None.
+        use_mmap (bool): Whether large files may be memory-mapped.
+        quick_min_size (Optional[int]): Size from which files are only
+            sampled; None hashes every file in full.
+        throttle (Optional[Throttle]): I/O and CPU limits applied to reads.
+
+    Returns:
+        List[Dict]: The files that could be hashed.
+    """
+    cancelled = cancelled or (lambda: False)
+    hashed = []
+    for file_info in files:
+        if cancelled():
+            break
+        if progress:
+            path = Path(file_info['path'])
+            progress(str(path.parent), path.name, len(hashed))
+        try:
+            if quick_min_size is not None and file_info['size'] >= quick_min_size:
+                file_info['hash'] = get_sample_hash(file_info['path'], throttle=throttle)
+                file_info['sampled'] = True
+            else:
+                file_info['hash'] = get_file_hash(file_info['path'], chunk_size, use_mmap,
+                                                  throttle)
+                file_info.pop('sampled', None)
+            hashed.append(file_info)
+        except (OSError, PermissionError) as e:
+            print(f"Error processing {file_info['path']}: {str(e)}")
+    return hashed
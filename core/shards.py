@@ -0,0 +1,125 @@
+import dataclasses
+import socket
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from . import engine
+from .engine import ScanConfig, SearchResult
+
+
+@dataclass
+class PartialIndex:
+    """
+    Hashed files of the roots scanned by one node, for a later merge.
+
+    Records carry name, path, size, date and hash, as in search results;
+    'root' indexes the node's own config.roots.
+    """
+    config: ScanConfig
+    host: str = field(default_factory=socket.gethostname)
+    files: List[Dict] = field(default_factory=list)
+    started: datetime = field(default_factory=datetime.now)
+    finished: Optional[datetime] = None
+    cancelled: bool = False
+
+    @property
+    def labels(self) -> List[str]:
+        """'host:root' for each root, as merged reports name them."""
+        return [f"{self.host}:{root}" for root in self.config.roots]
+
+
+def scan_shard(config: ScanConfig,
+               progress: Optional[Callable[[str, str, int], None]] = None,
+               cancelled: Optional[Callable[[], bool]] = None) -> PartialIndex:
+    """
+    Scan and hash the roots of one shard.
+
+    A size that is unique in the shard may still occur on another node,
+    so every file is hashed; quick mode samples large files as usual.
+    The walk, hashing, throttling and archive settings of the config
+    apply; its mode and match criteria are left to the merge.
+
+    Args:
+        config (ScanConfig): Settings with the roots of the shard.
+        progress (Optional[Callable[[str, str, int], None]]): Progress callback.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+
+    Returns:
+        PartialIndex: The files that could be hashed; flagged cancelled if
+            stopped early.
+
+    Raises:
+        ValueError: If the settings ask for directories or near-duplicates,
+            which need every file at once.
+        OSError: If a root directory cannot be accessed.
+    """
+    if not all(config.roots):
+        raise ValueError("Directory path must not be empty")
+    if config.match_directories or config.similarity_threshold is not None:
+        raise ValueError("Directory and near-duplicate matching cannot be sharded")
+    cancelled = cancelled or (lambda: False)
+    index = PartialIndex(config=config)
+    files = engine.scan_roots(config, progress, cancelled)
+    quick_min_size = config.quick_min_size if config.quick else None
+    index.files = engine.hash_files(config, files, progress, cancelled, quick_min_size)
+    for file_info in index.files:
+        file_info.pop('inode', None)
+    index.cancelled = cancelled()
+    index.finished = datetime.now()
+    return index
+
+
+def merge_indexes(indexes: List[PartialIndex], criteria: ScanConfig) -> SearchResult:
+    """
+    Combine partial indexes into one duplicate report, without reading files.
+
+    The roots of every index, in order, become the roots of the report,
+    named by their 'host:root' label, so in 'multi' mode the first index
+    has the highest priority and in 'master' mode the first of two roots
+    is the master. A file listed by several indexes of the same host is
+    kept once.
+
+    Args:
+        indexes (List[PartialIndex]): Indexes to merge.
+        criteria (ScanConfig): Settings giving the mode and the name, size
+            and date criteria; its roots are replaced.
+
+    Returns:
+        SearchResult: The merged report, flagged cancelled if any index was.
+
+    Raises:
+        ValueError: If there is no index, if the indexes were hashed with
+            different quick settings, or if the mode does not fit the
+            number of roots.
+    """
+    if not indexes:
+        raise ValueError("No partial index to merge")
+    quick = {(i.config.quick, i.config.quick_min_size if i.config.quick else None)
+             for i in indexes}
+    if len(quick) > 1:
+        raise ValueError("Partial indexes were hashed with different quick settings")
+    config = dataclasses.replace(criteria, roots=[label for i in indexes for label in i.labels],
+                                 quick=indexes[0].config.quick,
+                                 quick_min_size=indexes[0].config.quick_min_size)
+    config.validate()
+
+    files = []
+    seen = set()
+    offset = 0
+    for index in indexes:
+        for file_info in index.files:
+            if (index.host, file_info['path']) in seen:
+                continue
+            seen.add((index.host, file_info['path']))
+            files.append(dict(file_info, root=offset + file_info['root']))
+        offset += len(index.config.roots)
+
+    return SearchResult(
+        config=config,
+        groups=engine.match_files(config, files),
+        files_scanned=len(files),
+        started=min(i.started for i in indexes),
+        finished=max((i.finished for i in indexes if i.finished), default=None),
+        cancelled=any(i.cancelled for i in indexes),
+    )
@@ -0,0 +1,185 @@
+import hashlib
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+AVERAGE_CHUNK_SIZE = 8 * 1024
+MIN_CHUNK_SIZE = AVERAGE_CHUNK_SIZE // 4
+MAX_CHUNK_SIZE = AVERAGE_CHUNK_SIZE * 8
+MAX_BYTES = 64 * 1024 * 1024
+NUM_PERM = 128
+DEFAULT_THRESHOLD = 0.8
+WINDOW = 4
+MARK_BLOCK = 1024 * 1024
+
+_PRIME = (1 << 61) - 1
+_random = random.Random(0x5EED)
+# Fixed seeds, so signatures stay comparable between runs
+_WINDOW_TABLES = [bytes(_random.getrandbits(1) for _ in range(256)) for _ in range(WINDOW)]
+_PERMUTATIONS = [(_random.randrange(1, _PRIME), _random.randrange(0, _PRIME))
+                 for _ in range(NUM_PERM)]
+
+
+def _boundary_marks(data: bytes) -> bytes:
+    # One byte per position: the XOR of a random bit per byte of the
+    # WINDOW bytes starting there, one table per offset. translate and
+    # big-integer XOR do the per-byte work in C, a block at a time.
+    marks = bytearray()
+    for start in range(0, len(data), MARK_BLOCK):
+        size = min(MARK_BLOCK, len(data) - start)
+        block = data[start:start + size + WINDOW - 1]
+        acc = 0
+        for offset, table in enumerate(_WINDOW_TABLES):
+            lanes = block[offset:offset + size].translate(table)
+            acc ^= int.from_bytes(lanes + bytes(size - len(lanes)), 'big')
+        marks += acc.to_bytes(size, 'big')
+    return bytes(marks)
+
+
+def iter_chunks(data: bytes, average: int = AVERAGE_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Split data into content-defined chunks.
+
+    Every position gets a bit hashed from the few bytes starting there,
+    and a boundary is placed after a run of log2(average) - 1 set bits,
+    so an insertion only changes the chunks around it and the rest of
+    the file still yields the same chunks. The bits and the runs are
+    found by bytes methods rather than a loop per byte, so chunking runs
+    at tens of MB/s.
+
+    Args:
+        data (bytes): Content to split.
+        average (int): Target average chunk size, a power of two.
+
+    Yields:
+        bytes: Consecutive chunks covering the data.
+    """
+    minimum, maximum = average // 4, average * 8
+    run = b'\x01' * (average.bit_length() - 2)
+    marks = _boundary_marks(data)
+    start = 0
+    size = len(data)
+    while start < size:
+        end = min(start + maximum, size)
+        found = marks.find(run, max(start, start + minimum - len(run)), end)
+        cut = end if found < 0 else found + len(run)
+        yield data[start:cut]
+        start = cut
+
+
+def signature(filepath: str, max_bytes: int = MAX_BYTES,
+              throttle=None) -> Optional[Tuple[int, ...]]:
+    """
+    Compute the MinHash signature of a file's set of chunks.
+
+    Args:
+        filepath (str): File to fingerprint.
+        max_bytes (int): Only the first max_bytes bytes are read.
+        throttle (Optional[Throttle]): I/O and CPU limits applied to the read.
+
+    Returns:
+        Optional[Tuple[int, ...]]: NUM_PERM minimum hash values, or None
+            for an empty file.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    with open(filepath, 'rb') as f:
+        data = f.read(max_bytes)
+    if throttle:
+        throttle.read(len(data))
+    chunks = {int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), 'little')
+              for chunk in iter_chunks(data)}
+    if not chunks:
+        return None
+    return tuple(min((a * x + b) % _PRIME for x in chunks) for a, b in _PERMUTATIONS)
+
+
+def estimate_similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the chunk sets behind two signatures."""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+def choose_bands(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """
+    Choose the LSH banding for a similarity threshold.
+
+    Two signatures share a band with probability 1 - (1 - s^r)^b for a
+    similarity s; the steep part of that curve sits near (1/b)^(1/r), so
+    the split whose point is closest to (slightly below) the threshold is
+    chosen to favour recall.
+
+    Returns:
+        Tuple[int, int]: Number of bands and rows per band.
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1)
+               if num_perm % rows == 0]
+    return min(options, key=lambda o: abs((1 / o[0]) ** (1 / o[1]) - threshold * 0.9))
+
+
+def find_similar(signatures: Dict[int, Tuple[int, ...]],
+                 threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[List[int], float]]:
+    """
+    Cluster signatures whose estimated similarity reaches a threshold.
+
+    Identical signatures are joined first and bucketed once. Signatures
+    are bucketed by band, so only pairs sharing a bucket are compared
+    rather than every pair, and a pair already joined through other
+    members is not compared again; accepted pairs are joined into
+    clusters with a union-find.
+
+    Args:
+        signatures (Dict[int, Tuple[int, ...]]): Signatures by identifier.
+        threshold (float): Minimum estimated similarity of a pair.
+
+    Returns:
+        List[Tuple[List[int], float]]: Clusters of two or more identifiers
+            with the lowest similarity among the pairs that joined them.
+            Members joined through others can be less similar to each
+            other than that score.
+    """
+    by_signature = {}
+    for key, sig in signatures.items():
+        by_signature.setdefault(sig, []).append(key)
+
+    bands, rows = choose_bands(threshold)
+    buckets = {}
+    for sig, keys in by_signature.items():
+        for band in range(bands):
+            buckets.setdefault((band, sig[band * rows:(band + 1) * rows]), []).append(keys[0])
+
+    parent = {key: key for key in signatures}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    lowest = {}
+    for keys in by_signature.values():
+        for key in keys[1:]:
+            parent[key] = keys[0]
+        if len(keys) > 1:
+            lowest[keys[0]] = 1.0
+
+    rejected = set()
+    for members in buckets.values():
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                a, b = find(first), find(second)
+                if a == b:
+                    continue
+                pair = (first, second) if first < second else (second, first)
+                if pair in rejected:
+                    continue
+                score = estimate_similarity(signatures[first], signatures[second])
+                if score < threshold:
+                    rejected.add(pair)
+                    continue
+                parent[b] = a
+                lowest[a] = min(lowest.pop(b, 1.0), lowest.get(a, 1.0), score)
+
+    clusters = {}
+    for key in signatures:
+        clusters.setdefault(find(key), []).append(key)
+    return [(members, lowest[root]) for root, members in clusters.items() if len(members) > 1]
@@ -0,0 +1,155 @@
+import functools
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+LOAD_CHECK_INTERVAL = 1.0
+BACKOFF_START = 0.25
+BACKOFF_MAX_DELAY = 8.0
+MAX_BACKOFF = 60.0
+
+
+class TokenBucket:
+    """
+    Rate limiter refilled continuously at a fixed rate.
+
+    A bucket holds up to one second of tokens, so short bursts pass
+    unthrottled. Taking more tokens than are available puts the bucket
+    in debt and the caller sleeps until it is paid back, which keeps the
+    average rate exact even for amounts larger than the bucket.
+
+    Args:
+        rate (float): Tokens added per second.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount: float = 1):
+        """Take tokens, sleeping while the bucket is in debt."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+def _cpu_times() -> Optional[Tuple[int, int]]:
+    """Total and iowait jiffies of all CPUs, where /proc/stat exists."""
+    try:
+        with open('/proc/stat') as f:
+            fields = [int(x) for x in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    return (sum(fields), fields[4]) if len(fields) > 4 else None
+
+
+class Throttle:
+    """
+    Limits on the I/O and CPU a scan may use, shared by all its threads.
+
+    Every read and every filesystem operation of the walk goes through
+    the throttle: reads take their size from a bandwidth bucket and one
+    token from an IOPS bucket. A CPU share below 1 makes each thread sleep
+    in proportion to the CPU time it used since its last call (a duty
+    cycle). When the load average per CPU or the share of time spent in
+    I/O wait rises past its threshold, callers back off with growing
+    sleeps, at most MAX_BACKOFF seconds at a time so the scan always
+    progresses.
+
+    Args:
+        read_mb_s (Optional[float]): Read bandwidth in MB per second.
+        iops (Optional[float]): Reads and filesystem operations per second.
+        cpu_share (Optional[float]): Fraction of one CPU each thread may use.
+        max_load (Optional[float]): 1-minute load average per CPU above
+            which the scan backs off.
+        max_iowait (Optional[float]): Fraction of CPU time in I/O wait
+            above which the scan backs off (Linux only).
+    """
+
+    def __init__(self, read_mb_s: Optional[float] = None, iops: Optional[float] = None,
+                 cpu_share: Optional[float] = None, max_load: Optional[float] = None,
+                 max_iowait: Optional[float] = None):
+        self.bandwidth = TokenBucket(read_mb_s * 1024 * 1024) if read_mb_s else None
+        self.iops = TokenBucket(iops) if iops else None
+        self.cpu_share = cpu_share if cpu_share and cpu_share < 1 else None
+        self.max_load = max_load
+        self.max_iowait = max_iowait
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._overloaded = False
+        self._cpu_times = _cpu_times() if max_iowait is not None else None
+
+    def read(self, nbytes: int):
+        """Account for a read of nbytes, sleeping as the limits require."""
+        if self.bandwidth:
+            self.bandwidth.consume(nbytes)
+        self.operation()
+
+    def operation(self):
+        """Account for one filesystem operation, sleeping as the limits require."""
+        if self.iops:
+            self.iops.consume()
+        if self.cpu_share:
+            self._duty_cycle()
+        if self.max_load is not None or self.max_iowait is not None:
+            self._back_off()
+
+    def _duty_cycle(self):
+        now = time.thread_time()
+        last = getattr(self._local, 'cpu', None)
+        self._local.cpu = now
+        if last is not None and now > last:
+            time.sleep((now - last) * (1 - self.cpu_share) / self.cpu_share)
+
+    def _back_off(self):
+        waited, delay = 0.0, BACKOFF_START
+        while waited < MAX_BACKOFF and self.overloaded():
+            time.sleep(delay)
+            waited += delay
+            delay = min(delay * 2, BACKOFF_MAX_DELAY)
+
+    def overloaded(self) -> bool:
+        """Whether the system load or I/O wait is past its threshold,
+        measured at most once per LOAD_CHECK_INTERVAL."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked < LOAD_CHECK_INTERVAL:
+                return self._overloaded
+            self._checked = now
+            self._overloaded = False
+            if self.max_load is not None and hasattr(os, 'getloadavg'):
+                load = os.getloadavg()[0] / (os.cpu_count() or 1)
+                self._overloaded = load > self.max_load
+            if self.max_iowait is not None:
+                times = _cpu_times()
+                if times and self._cpu_times:
+                    total = times[0] - self._cpu_times[0]
+                    if total > 0 and (times[1] - self._cpu_times[1]) / total > self.max_iowait:
+                        self._overloaded = True
+                self._cpu_times = times
+            return self._overloaded
+
+
+@functools.lru_cache(maxsize=None)
+def shared_throttle(read_mb_s: Optional[float] = None, iops: Optional[float] = None,
+                    cpu_share: Optional[float] = None, max_load: Optional[float] = None,
+                    max_iowait: Optional[float] = None) -> Optional[Throttle]:
+    """
+    Get the throttle for a set of limits, or None without any limit.
+
+    Searches with the same limits share one throttle, so concurrent scans
+    in a process (e.g. the daemon's) stay within the limits together.
+    """
+    if not any(limit is not None for limit in (read_mb_s, iops, cpu_share,
+                                               max_load, max_iowait)):
+        return None
+    return Throttle(read_mb_s, iops, cpu_share, max_load, max_iowait)
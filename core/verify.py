@@ -0,0 +1,123 @@
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .archives import hash_member
+from .directories import directory_digest
+from .engine import PROBABLE, DuplicateGroup
+from .hashing import get_file_hash, get_sample_hash
+from .persistence import is_unchanged
+
+MISSING = "no longer exists"
+NO_SURVIVOR = "no surviving copy of its group"
+IN_ARCHIVE = "inside an archive"
+CHANGED = "no longer matches a surviving copy"
+
+
+def _fingerprint(file_info: Dict, full: bool, cache: Dict) -> str:
+    key = (file_info['path'], full)
+    if key not in cache:
+        path = file_info['path']
+        if file_info.get('directory'):
+            cache[key] = directory_digest(path)
+        elif 'member' in file_info:
+            cache[key] = hash_member(file_info)
+        else:
+            cache[key] = get_file_hash(path) if full else get_sample_hash(path)
+    return cache[key]
+
+
+def same_content(candidate: Dict, survivor: Dict, cache: Optional[Dict] = None,
+                 full: bool = False) -> bool:
+    """
+    Check that a file about to be deleted still matches a surviving copy.
+
+    When neither file changed since the scan (same size and date) and
+    full is not set, the sampled fingerprints are compared, which reads a
+    bounded amount of data; otherwise both files are hashed in full.
+    Directories are always compared by the digest of all their files, and
+    archive members are always hashed in full.
+
+    Args:
+        candidate (Dict): File information of the copy to delete.
+        survivor (Dict): File information of a copy that is kept.
+        cache (Optional[Dict]): Fingerprints already computed, by path.
+        full (bool): Compare full hashes even for unchanged files, e.g.
+            when the scan only sampled them.
+
+    Returns:
+        bool: True if the contents match; False if they differ or a file
+            cannot be read.
+    """
+    cache = {} if cache is None else cache
+    # Archive members only have a full hash
+    full = (full or 'member' in candidate or 'member' in survivor or
+            not (is_unchanged(candidate) and is_unchanged(survivor)))
+    try:
+        return _fingerprint(candidate, full, cache) == _fingerprint(survivor, full, cache)
+    except OSError:
+        return False
+
+
+def verify_deletions(selected: List[Dict], groups: List[DuplicateGroup],
+                     progress: Optional[Callable[[str, str, int], None]] = None,
+                     cancelled: Optional[Callable[[], bool]] = None
+                     ) -> Tuple[List[Dict], List[Tuple[Dict, str]]]:
+    """
+    Check selected files before deleting them.
+
+    A file is safe to delete only if a copy of its group that is not
+    selected still exists and still has the same content, the keeper
+    being tried first. Copies of a probable group, matched on sampled
+    hashes only, are compared by full hash first. Archive members are
+    never deleted. Near-duplicates
+    differ by nature, so for them the file and its surviving copy must
+    both be unchanged since the scan instead.
+
+    Args:
+        selected (List[Dict]): File information of the files to delete,
+            taken from the groups.
+        groups (List[DuplicateGroup]): Groups the files belong to.
+        progress (Optional[Callable[[str, str, int], None]]): Called with
+            folder, filename and the number of files checked so far.
+        cancelled (Optional[Callable[[], bool]]): Polled to stop early.
+
+    Returns:
+        Tuple[List[Dict], List[Tuple[Dict, str]]]: Files safe to delete,
+            and refused files with the reason. Files not reached before a
+            cancel are in neither list.
+    """
+    cancelled = cancelled or (lambda: False)
+    selected_ids = {id(f) for f in selected}
+    safe, refused = [], []
+    cache = {}
+    for group in groups:
+        candidates = [f for f in group.files if id(f) in selected_ids]
+        if not candidates:
+            continue
+        survivors = [f for f in group.files
+                     if id(f) not in selected_ids and os.path.exists(f.get('archive', f['path']))]
+        survivors.sort(key=lambda f: f is not group.keeper)
+        for candidate in candidates:
+            if cancelled():
+                return safe, refused
+            if progress:
+                path = Path(candidate['path'])
+                progress(str(path.parent), path.name, len(safe) + len(refused))
+            if 'member' in candidate:
+                refused.append((candidate, IN_ARCHIVE))
+            elif not os.path.exists(candidate['path']):
+                refused.append((candidate, MISSING))
+            elif not survivors:
+                refused.append((candidate, NO_SURVIVOR))
+            elif group.similarity is not None:
+                if is_unchanged(candidate) and any(is_unchanged(s) for s in survivors):
+                    safe.append(candidate)
+                else:
+                    refused.append((candidate, CHANGED))
+            elif any(same_content(candidate, survivor, cache, group.status == PROBABLE)
+                     for survivor in survivors):
+                safe.append(candidate)
+            else:
+                refused.append((candidate, CHANGED))
+    return safe, refused
@@ -0,0 +1,214 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict
+
+# inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct('iIII')
+POLL_INTERVAL = 2.0
+
+
+def _walk_dirs(root: str, recursive: bool):
+    yield root
+    if recursive:
+        visited = set()
+        for dirpath, dirnames, _ in os.walk(root):
+            # Bind mounts can make a directory its own descendant
+            for name in list(dirnames):
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path, follow_symlinks=False)
+                except OSError:
+                    continue
+                if (stat.st_dev, stat.st_ino) in visited:
+                    dirnames.remove(name)
+                    continue
+                visited.add((stat.st_dev, stat.st_ino))
+                yield path
+
+
+class InotifyWatcher:
+    """
+    Report changed directories with Linux inotify, through ctypes.
+
+    One watch is added per directory, including directories created while
+    watching.
+
+    Raises:
+        OSError: If inotify is unavailable or the watch limit is reached.
+    """
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths = {}  # watch descriptor -> directory
+        self.roots = {}  # root -> recursive
+        self._lock = threading.Lock()
+
+    def _watch(self, path: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == 28:  # ENOSPC: out of watches, the caller should poll instead
+                raise OSError(error, "inotify watch limit reached")
+            return  # Directory vanished or is unreadable
+        self._paths[wd] = path
+
+    def add(self, root: str, recursive: bool = True):
+        """Start watching a root directory."""
+        with self._lock:
+            self.roots[root] = recursive
+            for path in _walk_dirs(root, recursive):
+                self._watch(path)
+
+    def _recursive(self, path: str) -> bool:
+        return any(path == root or (recursive and path.startswith(root + os.sep))
+                   for root, recursive in self.roots.items())
+
+    def changes(self, timeout: float) -> Dict[str, bool]:
+        """
+        Wait for changes.
+
+        Args:
+            timeout (float): Seconds to wait for a first event.
+
+        Returns:
+            Dict[str, bool]: Changed directories, mapped to True when the
+                whole subtree must be listed again rather than only the
+                directory's own files.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        changed = {}
+        if not ready:
+            return changed
+        try:
+            data = os.read(self._fd, 1024 * 1024)
+        except BlockingIOError:
+            return changed
+        with self._lock:
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost: everything must be listed again
+                    changed.update({root: True for root in self.roots})
+                    continue
+                directory = self._paths.get(wd)
+                if mask & IN_IGNORED:
+                    self._paths.pop(wd, None)
+                if directory is None:
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    changed[directory] = True
+                    continue
+                changed.setdefault(directory, False)
+                if not (mask & IN_ISDIR) or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & (IN_CREATE | IN_MOVED_TO) and self._recursive(path):
+                    for subdirectory in _walk_dirs(path, True):
+                        self._watch(subdirectory)
+                if mask & (IN_CREATE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM):
+                    changed[path] = True
+        return changed
+
+    def close(self):
+        """Stop watching; a later call to changes raises ValueError."""
+        fd, self._fd = self._fd, -1
+        if fd >= 0:
+            os.close(fd)
+
+
+class PollingWatcher:
+    """
+    Report changed directories by comparing directory modification times.
+
+    Works everywhere, at the cost of a stat per directory and poll. Adding,
+    removing or renaming a file changes its directory's time, but editing a
+    file in place does not, so such changes need an explicit revalidation.
+
+    Args:
+        interval (float): Seconds between polls.
+    """
+
+    def __init__(self, interval: float = POLL_INTERVAL):
+        self.interval = interval
+        self.roots = {}  # root -> recursive
+        self._mtimes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _snapshot(root: str, recursive: bool) -> Dict[str, int]:
+        mtimes = {}
+        for path in _walk_dirs(root, recursive):
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+        return mtimes
+
+    def add(self, root: str, recursive: bool = True):
+        """Start watching a root directory."""
+        snapshot = self._snapshot(root, recursive)
+        with self._lock:
+            self.roots[root] = recursive
+            self._mtimes.update(snapshot)
+
+    def changes(self, timeout: float) -> Dict[str, bool]:
+        """Wait up to timeout seconds, then compare; see InotifyWatcher.changes."""
+        time.sleep(min(timeout, self.interval))
+        with self._lock:
+            roots = dict(self.roots)
+            previous = self._mtimes
+        current = {}
+        for root, recursive in roots.items():
+            current.update(self._snapshot(root, recursive))
+        changed = {}
+        for path, mtime in current.items():
+            if path not in previous:
+                changed[path] = True
+            elif previous[path] != mtime:
+                changed[path] = False
+        for path in previous.keys() - current.keys():
+            changed[path] = True
+        with self._lock:
+            self._mtimes = current
+        return changed
+
+    def close(self):
+        """Stop watching."""
+
+
+def create_watcher():
+    """Return an InotifyWatcher where possible, otherwise a PollingWatcher."""
+    try:
+        return InotifyWatcher()
+    except (OSError, AttributeError):
+        return PollingWatcher()
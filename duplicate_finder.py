@@ -1,12 +1,13 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-import hashlib
 from datetime import datetime
 import send2trash
-from typing import List, Dict
+from typing import Dict
 import fnmatch
 from tkcalendar import DateEntry
+from core import engine
+from core.engine import ScanConfig
 
 class DuplicateFinderApp:
 
@@ -287,37 +288,6 @@ class DuplicateFinderApp:
         for index, (_, item) in enumerate(items):
             self.tree.move(item, '', index)
 
-    def get_file_hash(self, filepath: str) -> str:
-        """Calculate MD5 hash of file."""
-        hasher = hashlib.md5()
-        with open(filepath, 'rb') as f:
-            buf = f.read(65536)  # Read in 64kb chunks
-            while len(buf) > 0:
-                hasher.update(buf)
-                buf = f.read(65536)
-        return hasher.hexdigest()
-
-    def get_file_info(self, filepath: str) -> Dict:
-        """Get file information."""
-        stat = os.stat(filepath)
-        return {
-            'name': os.path.basename(filepath),
-            'path': filepath,
-            'size': stat.st_size,
-            'date': datetime.fromtimestamp(stat.st_mtime),
-            'hash': self.get_file_hash(filepath)
-        }
-
-    def is_duplicate(self, file1: Dict, file2: Dict) -> bool:
-        """Check if files are duplicates based on selected criteria."""
-        if self.match_name.get() and file1['name'] != file2['name']:
-            return False
-        if self.match_size.get() and file1['size'] != file2['size']:
-            return False
-        if self.match_date.get() and abs((file1['date'] - file2['date']).total_seconds()) > 1:
-            return False
-        return True
-
     def apply_filters(self, file_info: Dict) -> bool:
         """Apply all filters to a file."""
         # Filename pattern filter
@@ -338,20 +308,6 @@ class DuplicateFinderApp:
 
         return True
 
-    def get_files(self, directory: str) -> List[Dict]:
-        """Get all files in directory."""
-        files = []
-        walk_fn = os.walk if self.include_subdirs.get() else lambda x: [(x, [], os.listdir(x))]
-        
-        for root, _, filenames in walk_fn(directory):
-            for filename in filenames:
-                filepath = os.path.join(root, filename)
-                try:
-                    files.append(self.get_file_info(filepath))
-                except (OSError, PermissionError):
-                    continue
-        return files
-
     def search(self):
         if not self.master_path.get():
             messagebox.showerror("Error", "Please select master directory")
@@ -369,26 +325,19 @@ class DuplicateFinderApp:
             self.root.config(cursor="wait")
             self.root.update()
 
-            master_files = self.get_files(self.master_path.get())
-            
             if self.mode.get() == "single":
-                # Find duplicates within single directory
-                duplicates = []
-                for i, file1 in enumerate(master_files):
-                    for file2 in master_files[i+1:]:
-                        if self.is_duplicate(file1, file2):
-                            if file1 not in duplicates:
-                                duplicates.append(file1)
-                            if file2 not in duplicates:
-                                duplicates.append(file2)
+                roots = [self.master_path.get()]
             else:
-                # Find duplicates between master and removable
-                removable_files = self.get_files(self.removable_path.get())
-                duplicates = [
-                    removable_file for removable_file in removable_files
-                    if any(self.is_duplicate(master_file, removable_file) 
-                          for master_file in master_files)
-                ]
+                roots = [self.master_path.get(), self.removable_path.get()]
+            result = engine.search(ScanConfig(
+                roots=roots,
+                mode=self.mode.get(),
+                recursive=self.include_subdirs.get(),
+                match_name=self.match_name.get(),
+                match_size=self.match_size.get(),
+                match_date=self.match_date.get()
+            ))
+            duplicates = result.duplicates()
 
             # Apply filters and display results
             for file_info in duplicates:
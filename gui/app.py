@@ -1,8 +1,11 @@
 import tkinter as tk
 from tkinter import ttk
-from .widgets import create_mode_frame, create_path_frame, create_options_frame, create_filter_frame
+from .widgets import create_mode_frame, create_path_frame
+from .widgets import create_options_frame, create_filter_frame
 from .widgets import create_tree_frame, create_button_frame
 from .handlers import FileHandler
+from core.grouping import DEFAULT_DATE_TOLERANCE
+from core.similarity import DEFAULT_THRESHOLD
 
 class DuplicateFinderApp:
     def __init__(self, root):
@@ -25,9 +28,19 @@ class DuplicateFinderApp:
         self.mode = tk.StringVar(value="master")
         self.include_subdirs = tk.BooleanVar(value=True)
         self.match_name = tk.BooleanVar(value=True)
+        self.name_matching = tk.StringVar(value='exact')
         self.match_size = tk.BooleanVar(value=True)
         self.match_date = tk.BooleanVar(value=False)
+        self.date_tolerance = tk.DoubleVar(value=DEFAULT_DATE_TOLERANCE)
+        self.async_scan = tk.BooleanVar(value=False)
+        self.quick_mode = tk.BooleanVar(value=False)
+        self.verify_quick = tk.BooleanVar(value=True)
+        self.match_directories = tk.BooleanVar(value=False)
+        self.scan_archives = tk.BooleanVar(value=False)
+        self.near_duplicates = tk.BooleanVar(value=False)
+        self.similarity_threshold = tk.DoubleVar(value=DEFAULT_THRESHOLD)
         self.move_to_trash = tk.BooleanVar(value=True)
+        self.link_method = tk.StringVar(value='hardlink')
         self._last_sort = None
         
         # Filter activation variables
@@ -38,7 +51,9 @@ class DuplicateFinderApp:
     def create_widgets(self):
         self.mode_frame = create_mode_frame(self)
         self.path_frame = create_path_frame(self)
+        self.roots_frame = None  # Created when multi mode is first selected
         self.options_frame = create_options_frame(self)
         self.filter_frame = create_filter_frame(self)
         self.tree_frame, self.tree = create_tree_frame(self)
         self.button_frame = create_button_frame(self)
+        self.file_handler.update_mode()
@@ -1,13 +1,14 @@
 from tkinter import filedialog, messagebox
 import os
 from datetime import datetime
-import send2trash
 import fnmatch
-from typing import List, Dict
+import itertools
+import shutil
 from pathlib import Path
 import threading
-from .utils import get_file_hash
 from .progress_dialog import ProgressDialog
+from .result_stream import ResultStream
+from .widgets import create_roots_frame
 
 
 class FileHandler:
@@ -15,15 +16,22 @@ class FileHandler:
         self.app = app
         self._last_sort = None
         self.files_data = []
+        self.result = None
+        self.item_files = {}  # tree item -> (file information, group)
 
     def update_mode(self):
         """Update UI based on selected mode"""
-        if self.app.mode.get() == "single":
-            self.app.removable_entry.config(state='disabled')
-            self.app.removable_button.config(state='disabled')
-        else:
-            self.app.removable_entry.config(state='normal')
-            self.app.removable_button.config(state='normal')
+        mode = self.app.mode.get()
+        removable_state = 'normal' if mode == "master" else 'disabled'
+        self.app.removable_entry.config(state=removable_state)
+        self.app.removable_button.config(state=removable_state)
+
+        if mode == "multi":
+            if self.app.roots_frame is None:
+                self.app.roots_frame = create_roots_frame(self.app)
+            self.app.roots_frame.pack(fill='x', padx=5, pady=5, after=self.app.path_frame)
+        elif self.app.roots_frame is not None:
+            self.app.roots_frame.pack_forget()
 
     def browse_master(self):
         """Browse for master directory"""
@@ -37,203 +45,269 @@ class FileHandler:
         if path:
             self.app.removable_path.set(path)
 
+    def add_root(self):
+        """Browse for a directory and append it to the roots list"""
+        path = filedialog.askdirectory()
+        if path and path not in self.app.roots_listbox.get(0, 'end'):
+            self.app.roots_listbox.insert('end', path)
+
+    def remove_root(self):
+        """Remove the selected directory from the roots list"""
+        for index in reversed(self.app.roots_listbox.curselection()):
+            self.app.roots_listbox.delete(index)
+
+    def move_root(self, offset: int):
+        """Move the selected root up or down in priority"""
+        selection = self.app.roots_listbox.curselection()
+        if not selection:
+            return
+        index = selection[0]
+        target = index + offset
+        if not 0 <= target < self.app.roots_listbox.size():
+            return
+        path = self.app.roots_listbox.get(index)
+        self.app.roots_listbox.delete(index)
+        self.app.roots_listbox.insert(target, path)
+        self.app.roots_listbox.selection_set(target)
+
     def browse_filter_dir(self):
         """Browse for filter directory"""
         path = filedialog.askdirectory()
         if path:
             self.app.filter_directory.set(path)
 
-    def get_file_info(self, filepath: str) -> Dict:
-        """Get file information including hash"""
-        try:
-            # Convert to Path object and resolve to absolute path
-            path = Path(filepath).resolve()
-            stat = path.stat()
-            return {
-                'name': path.name,
-                'path': str(path),
-                'size': stat.st_size,
-                'date': datetime.fromtimestamp(stat.st_mtime),
-                'hash': get_file_hash(str(path))
-            }
-        except Exception as e:
-            raise OSError(f"Error accessing file {filepath}: {str(e)}")
+    def get_config(self):
+        """Snapshot the search settings from the UI as a ScanConfig"""
+        from core.engine import ScanConfig
 
-    def get_files(self, directory: str) -> List[Dict]:
-        """Get all files in directory"""
-        files = []
-        try:
-            print(f"Accessing directory: {directory}")
-            # Convert to Path object
-            dir_path = Path(directory).resolve()
-            
-            if self.app.include_subdirs.get():
-                print("Including subdirectories")
-                # Use rglob for recursive search
-                file_paths = dir_path.rglob('*')
-            else:
-                print("Single directory mode")
-                # Use glob for single directory
-                file_paths = dir_path.glob('*')
-    
-            # Convert generator to list for length calculation
-            file_paths = list(file_paths)
-            print(f"Found {len(file_paths)} files")
-            
-            # Filter for files only (exclude directories)
-            file_paths = [f for f in file_paths if f.is_file()]
-            
-            for filepath in file_paths:
-                print(f"Processing file: {filepath}")
-                try:
-                    print(f"Appending file info for {filepath}")
-                    files.append(self.get_file_info(str(filepath)))
-                except (OSError, PermissionError) as e:
-                    # Log the error but continue processing
-                    print(f"Error processing {filepath}: {str(e)}")
-                    continue
-                    
-        except Exception as e:
-            messagebox.showerror("Error", f"Error accessing directory {directory}: {str(e)}")
-            
-        return files
-    
-
-    def is_duplicate(self, file1: Dict, file2: Dict) -> bool:
-        """Check if files are duplicates based on selected criteria"""
-        if self.app.match_name.get() and file1['name'] != file2['name']:
-            return False
-        if self.app.match_size.get() and file1['size'] != file2['size']:
-            return False
-        if self.app.match_date.get() and abs((file1['date'] - file2['date']).total_seconds()) > 1:
-            return False
-        return file1['hash'] == file2['hash']
+        mode = self.app.mode.get()
+        if mode == "multi":
+            roots = list(self.app.roots_listbox.get(0, 'end'))
+        elif mode == "master":
+            roots = [self.app.master_path.get(), self.app.removable_path.get()]
+        else:
+            roots = [self.app.master_path.get()]
+        return ScanConfig(
+            roots=roots,
+            mode=mode,
+            recursive=self.app.include_subdirs.get(),
+            match_name=self.app.match_name.get(),
+            name_matching=self.app.name_matching.get(),
+            match_size=self.app.match_size.get(),
+            match_date=self.app.match_date.get(),
+            date_tolerance=self.app.date_tolerance.get(),
+            async_scan=self.app.async_scan.get(),
+            quick=self.app.quick_mode.get(),
+            match_directories=self.app.match_directories.get(),
+            scan_archives=self.app.scan_archives.get(),
+            similarity_threshold=(self.app.similarity_threshold.get()
+                                  if self.app.near_duplicates.get() else None)
+        )
 
     def search(self):
         """Search for duplicate files"""
-        if not self.app.master_path.get():
+        if self.app.mode.get() == "multi":
+            if self.app.roots_listbox.size() < 2:
+                messagebox.showerror("Error", "Please add at least two root directories")
+                return
+        elif not self.app.master_path.get():
             messagebox.showerror("Error", "Please select master directory")
             return
     
         if self.app.mode.get() == "master" and not self.app.removable_path.get():
             messagebox.showerror("Error", "Please select removable directory")
             return
+
+        from core import engine
+        from core.client import DaemonClient, default_socket
+
+        config = self.get_config()
+        verify = config.quick and self.app.verify_quick.get()
+        daemon_socket = default_socket()
     
         # Clear previous results
-        for item in self.app.tree.get_children():
-            self.app.tree.delete(item)
+        self.clear_results()
     
         # Create and show progress dialog
-        progress = ProgressDialog(self.app.root, "Searching for duplicates")
+        if daemon_socket:
+            # The daemon reports no progress and cannot be interrupted
+            progress = ProgressDialog(self.app.root,
+                                      f"Searching for duplicates in the daemon at {daemon_socket}")
+            progress.cancel_button.config(state='disabled')
+        else:
+            progress = ProgressDialog(self.app.root, "Searching for duplicates")
+        stream = ResultStream()
         
         def search_thread():
+            # Runs without touching Tk: settings come from the config
+            # snapshot, results go back through the stream
             print("Starting search thread")
             try:
-                duplicates = []
-                matches_count = 0
-    
-                def process_files(files1, files2=None):
-                    print("Processing files")
-                    nonlocal matches_count
-                    if files2 is None:
-                        print("No second file list provided")
-                        files2 = files1
-                        start_idx = 1
-                    else:
-                        print("Second file list provided")
-                        start_idx = 0
-    
-                    print(f"Files1 length: {len(files1)}")
-                    for i, file1 in enumerate(files1):
-                        print(f"Processing file {i + 1} of {len(files1)}")
-                        if progress.cancelled:
-                            return None
-                            
-                        current_files = files2[i + start_idx:] if files2 is files1 else files2
-                        
-                        # Update progress dialog
-                        progress.update(
-                            os.path.dirname(file1['path']),
-                            os.path.basename(file1['path']),
-                            matches_count
-                        )
-    
-                        for file2 in current_files:
-                            print(f"Comparing {file1['name']} with {file2['name']}")
-                            if progress.cancelled:
-                                return None
-                                
-                            if self.is_duplicate(file1, file2):
-                                print(f"Found duplicate: {file1['name']} and {file2['name']}")
-                                matches_count += 1
-                                if self.app.mode.get() == "single":
-                                    if file1 not in duplicates:
-                                        duplicates.append(file1)
-                                    if file2 not in duplicates:
-                                        duplicates.append(file2)
-                                else:
-                                    if file2 not in duplicates:
-                                        duplicates.append(file2)
-                    
-                    return duplicates
-    
-                print("Getting master files. This may take a while...")
-                master_files = self.get_files(self.app.master_path.get())
-                
-                if self.app.mode.get() == "single":
-                    print("Single directory mode")
-                    # Find duplicates within single directory
-                    result = process_files(master_files)
+                if daemon_socket:
+                    # Thin client: the daemon does the work with its warm index
+                    result = DaemonClient(daemon_socket).scan(config)
+                    for group in result.groups:
+                        stream.add(group)
                 else:
-                    print("Master and removable mode")  
-                    # Find duplicates between master and removable
-                    print("Getting removable files. This may take a while...")
-                    removable_files = self.get_files(self.app.removable_path.get())
-                    result = process_files(master_files, removable_files)
-    
-                def update_ui():
-                    # Close progress dialog
-                    progress.queue.put(None)  # Signal to close
-                    
-                    if progress.cancelled:
-                        messagebox.showinfo("Cancelled", "Search was cancelled by user")
-                        return
-    
-                    # Display results
-                    if result:
-                        for file_info in result:
-                            item = self.app.tree.insert('', 'end', values=(
-                                False,
-                                file_info['name'],
-                                file_info['path'],
-                                f"{file_info['size']:,} bytes",
-                                file_info['date'].strftime('%Y-%m-%d %H:%M:%S')
-                            ))
-                            self.app.tree.item(item, tags=('unchecked',))
-                        
-                        messagebox.showinfo("Complete", f"Found {len(result)} duplicate files")
-                    else:
-                        messagebox.showinfo("Complete", "No duplicate files found")
-    
-                # Schedule UI update on main thread
-                self.app.root.after(0, update_ui)
-    
+                    result = engine.search(config, progress.update,
+                                           lambda: progress.cancelled, stream.add)
             except Exception as error:
-                # Create a closure that captures the error
-                def show_error(e):
-                    def _show():
-                        progress.queue.put(None)  # Signal to close
-                        messagebox.showerror("Error", f"An error occurred: {str(e)}")
-                    return _show
-                
-                # Schedule error display on main thread
-                self.app.root.after(0, show_error(error))
+                stream.fail(error)
+            else:
+                stream.finish(result)
+
+        def show_batch(groups):
+            for group in groups:
+                self.insert_group(group, config.mode)
+
+        def search_done(result):
+            progress.queue.put(None)  # Signal to close
+            self.result = result
+            if result.cancelled:
+                messagebox.showinfo("Cancelled", "Search was cancelled by user")
+                return
+
+            duplicates = result.duplicates()
+            if duplicates:
+                if verify:
+                    self.start_verification(result)
+                if config.mode == "single":
+                    messagebox.showinfo("Complete", f"Found {len(duplicates)} duplicate files")
+                else:
+                    messagebox.showinfo("Complete", f"Found {len(result.groups)} duplicate groups "
+                                        f"with {len(duplicates)} redundant copies")
+            else:
+                messagebox.showinfo("Complete", "No duplicate files found")
+
+        def search_failed(error):
+            progress.queue.put(None)  # Signal to close
+            messagebox.showerror("Error", f"An error occurred: {str(error)}")
     
         # Start search in separate thread
         thread = threading.Thread(target=search_thread, daemon=True)
         thread.start()
-    
-    
+        stream.poll(self.app.root, show_batch, search_done, search_failed)
+
+    def clear_results(self):
+        """Remove every row from the treeview"""
+        for item in self.app.tree.get_children():
+            self.app.tree.delete(item)
+        self.item_files.clear()
+
+    def show_groups(self, result):
+        """Fill the treeview with the groups of a result, keeping checked rows"""
+        checked = {
+            self.app.tree.item(item)['values'][2]
+            for item in self.app.tree.get_children()
+            if self.app.tree.item(item)['values'][0]
+        }
+        self.clear_results()
+        for group in result.groups:
+            self.insert_group(group, result.config.mode, checked)
+
+    def save_results(self):
+        """Save the current results to a file"""
+        from core import persistence
+
+        if self.result is None:
+            messagebox.showinfo("Info", "No results to save")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=persistence.RESULT_EXTENSION,
+            filetypes=[("Duplicate results", f"*{persistence.RESULT_EXTENSION}")])
+        if not path:
+            return
+        try:
+            persistence.save_result(self.result, path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not save results:\n{str(e)}")
+
+    def load_results(self):
+        """Load saved results, dropping rows whose files changed since the scan"""
+        from core import persistence
+
+        path = filedialog.askopenfilename(
+            filetypes=[("Duplicate results", f"*{persistence.RESULT_EXTENSION}"),
+                       ("All files", "*")])
+        if not path:
+            return
+        try:
+            result = persistence.load_result(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not load results:\n{str(e)}")
+            return
+
+        self.clear_results()
+        saved_groups = len(result.groups)
+        valid_groups = persistence.iter_valid_groups(result)
+        loaded = []
+
+        def load_batch():
+            # Stat a batch of groups per tick so the window stays responsive
+            batch = list(itertools.islice(valid_groups, 200))
+            for group in batch:
+                loaded.append(group)
+                self.insert_group(group, result.config.mode)
+            if len(batch) == 200:
+                self.app.root.after(1, load_batch)
+                return
+            result.groups = loaded
+            self.result = result
+            dropped = saved_groups - len(loaded)
+            messagebox.showinfo("Loaded", f"Loaded {len(loaded)} duplicate groups from "
+                                f"{result.started:%Y-%m-%d %H:%M:%S}"
+                                + (f"\n{dropped} groups dropped because files changed" if dropped else ""))
+
+        load_batch()
+
+    def start_verification(self, result):
+        """Confirm probable groups with full hashes without blocking the UI"""
+        from core import engine
+
+        if not any(group.status == engine.PROBABLE for group in result.groups):
+            return
+
+        stream = ResultStream()
+
+        def verify_thread():
+            try:
+                engine.verify_groups(result)
+            except Exception as error:
+                stream.fail(error)
+            else:
+                stream.finish(result)
+
+        def verify_failed(error):
+            print(f"Verification failed: {str(error)}")
+
+        threading.Thread(target=verify_thread, daemon=True).start()
+        stream.poll(self.app.root, lambda groups: None, self.show_groups, verify_failed)
+
+    def insert_group(self, group, mode: str, checked=()):
+        """Add the rows of a duplicate group to the treeview"""
+        keeper = ''
+        if group.keeper is not None:
+            keeper = f"#{group.keeper['root'] + 1} {group.keeper['path']}"
+        files = group.files if mode == "single" else group.redundant
+        status = group.status
+        if group.similarity is not None:
+            status += f" {group.similarity:.0%}"
+        for file_info in files:
+            name = file_info['name']
+            if file_info.get('directory'):
+                name = f"{name}{os.sep} ({file_info['file_count']} files)"
+            item = self.app.tree.insert('', 'end', values=(
+                False,
+                name,
+                file_info['path'],
+                f"{file_info['size']:,} bytes",
+                file_info['date'].strftime('%Y-%m-%d %H:%M:%S'),
+                keeper,
+                status
+            ))
+            self.item_files[item] = (file_info, group)
+            self.app.tree.set(item, 'select', file_info['path'] in checked)
+            self.app.tree.item(item, tags=('checked' if file_info['path'] in checked else 'unchecked',))
 
     def apply_selection_filters(self):
         """Apply filters to select files"""
@@ -324,11 +398,11 @@ class FileHandler:
             self.app.tree.move(item, '', index)
 
     def delete_selected(self):
-        """Delete selected files"""
+        """Verify selected files against their groups, then delete them"""
         selected = [
-            self.app.tree.item(item)['values'][2]  # Get file path
+            self.item_files[item]
             for item in self.app.tree.get_children()
-            if self.app.tree.item(item)['values'][0]  # Check if selected
+            if self.app.tree.item(item)['values'][0] and item in self.item_files
         ]
 
         if not selected:
@@ -338,23 +412,130 @@ class FileHandler:
         if not messagebox.askyesno("Confirm", f"Delete {len(selected)} files?"):
             return
 
+        from core.verify import verify_deletions
+
+        files = [file_info for file_info, _ in selected]
+        groups = list({id(group): group for _, group in selected}.values())
+        progress = ProgressDialog(self.app.root, "Verifying files before deletion")
+        stream = ResultStream()
+
+        def verify_thread():
+            try:
+                checked = verify_deletions(files, groups, progress.update,
+                                           lambda: progress.cancelled)
+            except Exception as error:
+                stream.fail(error)
+            else:
+                stream.finish(checked)
+
+        def verify_done(checked):
+            progress.queue.put(None)  # Signal to close
+            if progress.cancelled:
+                messagebox.showinfo("Cancelled", "Deletion was cancelled by user")
+                return
+            safe, refused = checked
+            if refused:
+                details = "\n".join(f"{f['path']}: {reason}" for f, reason in refused[:20])
+                if len(refused) > 20:
+                    details += f"\n... and {len(refused) - 20} more"
+                if not safe:
+                    messagebox.showwarning("Not deleted", f"No file passed verification:\n\n{details}")
+                    self.remove_files([], refused)
+                    return
+                if not messagebox.askyesno("Confirm", f"{len(refused)} files failed verification "
+                                           f"and will be kept:\n\n{details}\n\n"
+                                           f"Delete the other {len(safe)} files?"):
+                    return
+            self.remove_files([f['path'] for f in safe], refused)
+
+        def verify_failed(error):
+            progress.queue.put(None)  # Signal to close
+            messagebox.showerror("Error", f"Could not verify files:\n{str(error)}")
+
+        threading.Thread(target=verify_thread, daemon=True).start()
+        stream.poll(self.app.root, lambda groups: None, verify_done, verify_failed)
+
+    def consolidate_selected(self):
+        """Replace selected files with links to a surviving copy"""
+        selected = [
+            self.item_files[item]
+            for item in self.app.tree.get_children()
+            if self.app.tree.item(item)['values'][0] and item in self.item_files
+        ]
+
+        if not selected:
+            messagebox.showinfo("Info", "No files selected")
+            return
+
+        method = self.app.link_method.get()
+        if not messagebox.askyesno("Confirm", f"Replace {len(selected)} files with {method}s?"):
+            return
+
+        from core.consolidate import consolidate
+
+        files = [file_info for file_info, _ in selected]
+        groups = list({id(group): group for _, group in selected}.values())
+        journal = f"link_journal_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        progress = ProgressDialog(self.app.root, "Replacing files with links")
+        stream = ResultStream()
+
+        def link_thread():
+            try:
+                done = consolidate(files, groups, journal, method, progress.update,
+                                   lambda: progress.cancelled)
+            except Exception as error:
+                stream.fail(error)
+            else:
+                stream.finish(done)
+
+        def link_done(done):
+            progress.queue.put(None)  # Signal to close
+            linked, refused = done
+            message = (f"{len(linked)} files replaced, "
+                       f"{sum(f['size'] for f in linked):,} bytes reclaimed.\n"
+                       f"Journal for rollback: {journal}")
+            if refused:
+                details = "\n".join(f"{f['path']}: {reason}" for f, reason in refused[:20])
+                if len(refused) > 20:
+                    details += f"\n... and {len(refused) - 20} more"
+                message += f"\n\n{len(refused)} files were kept:\n\n{details}"
+            messagebox.showinfo("Links", message)
+            self.search()
+
+        def link_failed(error):
+            progress.queue.put(None)  # Signal to close
+            messagebox.showerror("Error", f"Could not replace files:\n{str(error)}")
+
+        threading.Thread(target=link_thread, daemon=True).start()
+        stream.poll(self.app.root, lambda groups: None, link_done, link_failed)
+
+    def remove_files(self, selected, refused=()):
+        """Delete verified files, logging them with the refused ones"""
+        import send2trash
+
         log_file = f"delete_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        
+
+        for file_info, reason in refused:
+            with open(log_file, 'a', encoding='utf-8') as f:
+                f.write(f"{datetime.now()}: Kept ({reason}) - {file_info['path']}\n")
+
         for filepath in selected:
             try:
                 # Convert to Path object and resolve to absolute path
                 path = Path(filepath).resolve()
                 
+                # A whole redundant directory goes in one operation
+                remove = shutil.rmtree if path.is_dir() else os.remove
                 if self.app.move_to_trash.get():
                     try:
                         send2trash.send2trash(str(path))
                         action = "Moved to trash"
                     except Exception as trash_error:
                         # If send2trash fails, try direct deletion
-                        os.remove(str(path))
+                        remove(str(path))
                         action = "Deleted (fallback)"
                 else:
-                    os.remove(str(path))
+                    remove(str(path))
                     action = "Deleted"
                 
                 with open(log_file, 'a', encoding='utf-8') as f:
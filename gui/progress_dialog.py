@@ -65,8 +65,8 @@ class ProgressDialog:
                 self.file_label.config(text=f"File: {filename}")
                 self.progress_label.config(text=f"Files matched: {matches}")
         except queue.Empty:
-            if not self.cancelled:
-                self.top.after(100, self.check_queue)
+            # Keep polling after a cancel so the close signal is still seen
+            self.top.after(100, self.check_queue)
     
     def update(self, folder: str, filename: str, matches: int):
         """Queue an update to the dialog"""
@@ -0,0 +1,69 @@
+import queue
+import time
+from typing import Callable
+
+BATCH_SIZE = 100
+BATCH_INTERVAL = 0.2  # seconds
+POLL_INTERVAL_MS = 100
+MAX_MESSAGES_PER_POLL = 10
+
+
+class ResultStream:
+    """
+    Hand results from a worker thread to the Tk main thread.
+
+    The worker only touches a queue: groups are batched so the main thread
+    does not wake up for every single one, and the final result or error
+    ends the stream. The main thread drains the queue with Tk's after(),
+    so widgets are never accessed from the worker.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._batch = []
+        self._last_flush = time.monotonic()
+
+    def add(self, group):
+        """Queue a group (worker thread)"""
+        self._batch.append(group)
+        if (len(self._batch) >= BATCH_SIZE or
+                time.monotonic() - self._last_flush >= BATCH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        """Send the pending batch (worker thread)"""
+        if self._batch:
+            self.queue.put(('groups', self._batch))
+            self._batch = []
+        self._last_flush = time.monotonic()
+
+    def finish(self, result):
+        """End the stream with the final result (worker thread)"""
+        self.flush()
+        self.queue.put(('done', result))
+
+    def fail(self, error: Exception):
+        """End the stream with an error (worker thread)"""
+        self.flush()
+        self.queue.put(('error', error))
+
+    def poll(self, widget, on_groups: Callable, on_done: Callable, on_error: Callable):
+        """
+        Deliver queued messages to the callbacks (main thread).
+
+        Keeps rescheduling itself with widget.after until the stream ends.
+        """
+        for _ in range(MAX_MESSAGES_PER_POLL):
+            try:
+                kind, payload = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'groups':
+                on_groups(payload)
+            elif kind == 'done':
+                on_done(payload)
+                return
+            else:
+                on_error(payload)
+                return
+        widget.after(POLL_INTERVAL_MS, self.poll, widget, on_groups, on_done, on_error)
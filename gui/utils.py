@@ -1,10 +1,12 @@
 import tkinter as tk
-import hashlib
+import itertools
 import os
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import fnmatch
 
+from core.grouping import DEFAULT_DATE_TOLERANCE, group_duplicates
+
 def create_checkbox(checked: bool) -> tk.Canvas:
     """
     Create a checkbox image for the treeview.
@@ -24,29 +26,6 @@ def create_checkbox(checked: bool) -> tk.Canvas:
         checkbox.create_line(size//2, size-4, size-4, 4, width=2)
     return checkbox
 
-def get_file_hash(filepath: str, chunk_size: int = 65536) -> str:
-    """
-    Calculate MD5 hash of a file.
-    
-    Args:
-        filepath (str): Path to the file to hash.
-        chunk_size (int): Size of chunks to read, defaults to 64KB.
-    
-    Returns:
-        str: Hexadecimal representation of the file's MD5 hash.
-    
-    Raises:
-        OSError: If there are problems reading the file.
-        PermissionError: If there are permission issues accessing the file.
-    """
-    hasher = hashlib.md5()
-    with open(filepath, 'rb') as f:
-        buf = f.read(chunk_size)
-        while len(buf) > 0:
-            hasher.update(buf)
-            buf = f.read(chunk_size)
-    return hasher.hexdigest()
-
 def format_file_size(size: int) -> str:
     """
     Format file size in bytes to human-readable format.
@@ -118,61 +97,30 @@ def is_in_date_range(file_date: datetime, start_date: datetime, end_date: dateti
     """
     return start_date <= file_date <= end_date
 
-def get_file_info(filepath: str) -> Dict[str, any]:
-    """
-    Get comprehensive file information.
-    
-    Args:
-        filepath (str): Path to the file.
-    
-    Returns:
-        Dict[str, any]: Dictionary containing file information:
-            - name: filename
-            - path: full path
-            - size: size in bytes
-            - date: modification datetime
-            - hash: MD5 hash
-    
-    Raises:
-        OSError: If there are problems accessing the file.
-        PermissionError: If there are permission issues.
-    """
-    stat = os.stat(filepath)
-    return {
-        'name': os.path.basename(filepath),
-        'path': filepath,
-        'size': stat.st_size,
-        'date': datetime.fromtimestamp(stat.st_mtime),
-        'hash': get_file_hash(filepath)
-    }
-
 def find_duplicates(files: List[Dict[str, any]], 
                    match_name: bool = True,
                    match_size: bool = True,
-                   match_date: bool = False) -> List[Tuple[Dict[str, any], Dict[str, any]]]:
+                   match_date: bool = False,
+                   date_tolerance: float = DEFAULT_DATE_TOLERANCE) -> List[Tuple[Dict[str, any], Dict[str, any]]]:
     """
     Find duplicate files based on specified criteria.
     
     Args:
-        files (List[Dict[str, any]]): List of file information dictionaries.
+        files (List[Dict[str, any]]): List of hashed file information dictionaries.
         match_name (bool): Whether to match filenames.
         match_size (bool): Whether to match file sizes.
         match_date (bool): Whether to match modification dates.
+        date_tolerance (float): Seconds two dates may differ and still match.
     
     Returns:
         List[Tuple[Dict[str, any], Dict[str, any]]]: List of duplicate file pairs.
     """
     duplicates = []
-    for i, file1 in enumerate(files):
-        for file2 in files[i + 1:]:
-            if match_name and file1['name'] != file2['name']:
-                continue
-            if match_size and file1['size'] != file2['size']:
-                continue
-            if match_date and abs((file1['date'] - file2['date']).total_seconds()) > 1:
+    for group in group_duplicates(files, match_name, match_size, match_date, date_tolerance):
+        for file1, file2 in itertools.combinations(group, 2):
+            if match_date and abs((file1['date'] - file2['date']).total_seconds()) > date_tolerance:
                 continue
-            if file1['hash'] == file2['hash']:
-                duplicates.append((file1, file2))
+            duplicates.append((file1, file2))
     return duplicates
 
 def create_log_filename() -> str:
@@ -1,5 +1,6 @@
 import tkinter as tk
 from tkinter import ttk
+from core.names import NAME_MODES
 from .utils import create_checkbox
 
 def create_mode_frame(app):
@@ -12,6 +13,9 @@ def create_mode_frame(app):
     ttk.Radiobutton(frame, text="Single Directory", 
                    variable=app.mode, value="single",
                    command=app.file_handler.update_mode).pack(side='left', padx=5)
+    ttk.Radiobutton(frame, text="Multiple Roots", 
+                   variable=app.mode, value="multi",
+                   command=app.file_handler.update_mode).pack(side='left', padx=5)
 
     return frame
 
@@ -36,18 +40,65 @@ def create_path_frame(app):
     frame.grid_columnconfigure(1, weight=1)
     return frame
 
+def create_roots_frame(app):
+    # Built on the first switch to multi mode and placed below the paths
+    frame = ttk.LabelFrame(app.root, text="Roots (highest priority first)", padding=5)
+
+    app.roots_listbox = tk.Listbox(frame, height=4)
+    app.roots_listbox.grid(row=0, column=0, sticky='ew')
+
+    buttons = ttk.Frame(frame)
+    buttons.grid(row=0, column=1, sticky='n', padx=5)
+    ttk.Button(buttons, text="Add", command=app.file_handler.add_root).pack(fill='x')
+    ttk.Button(buttons, text="Remove", command=app.file_handler.remove_root).pack(fill='x')
+    ttk.Button(buttons, text="Up",
+               command=lambda: app.file_handler.move_root(-1)).pack(fill='x')
+    ttk.Button(buttons, text="Down",
+               command=lambda: app.file_handler.move_root(1)).pack(fill='x')
+
+    frame.grid_columnconfigure(0, weight=1)
+    return frame
+
 def create_options_frame(app):
     frame = ttk.LabelFrame(app.root, text="Match Options", padding=5)
     frame.pack(fill='x', padx=5, pady=5)
 
-    ttk.Checkbutton(frame, text="Include Subdirectories", 
+    match_row = ttk.Frame(frame)
+    match_row.pack(fill='x')
+    ttk.Checkbutton(match_row, text="Include Subdirectories", 
                    variable=app.include_subdirs).pack(side='left', padx=5)
-    ttk.Checkbutton(frame, text="Match Name", 
+    ttk.Checkbutton(match_row, text="Match Name", 
                    variable=app.match_name).pack(side='left', padx=5)
-    ttk.Checkbutton(frame, text="Match Size", 
+    ttk.Combobox(match_row, textvariable=app.name_matching, values=NAME_MODES,
+                 state='readonly', width=10).pack(side='left', padx=5)
+    ttk.Checkbutton(match_row, text="Match Size", 
                    variable=app.match_size).pack(side='left', padx=5)
-    ttk.Checkbutton(frame, text="Match Date", 
+    ttk.Checkbutton(match_row, text="Match Date", 
                    variable=app.match_date).pack(side='left', padx=5)
+    ttk.Label(match_row, text="Tolerance (s):").pack(side='left')
+    ttk.Spinbox(match_row, from_=0, to=86400, increment=1, width=6,
+               textvariable=app.date_tolerance).pack(side='left', padx=5)
+
+    scan_row = ttk.Frame(frame)
+    scan_row.pack(fill='x')
+    ttk.Checkbutton(scan_row, text="Network Scan (async)", 
+                   variable=app.async_scan).pack(side='left', padx=5)
+    ttk.Checkbutton(scan_row, text="Quick Mode (sample large files)", 
+                   variable=app.quick_mode).pack(side='left', padx=5)
+    ttk.Checkbutton(scan_row, text="Verify in Background", 
+                   variable=app.verify_quick).pack(side='left', padx=5)
+    ttk.Checkbutton(scan_row, text="Whole Directories", 
+                   variable=app.match_directories).pack(side='left', padx=5)
+    ttk.Checkbutton(scan_row, text="Inside Archives", 
+                   variable=app.scan_archives).pack(side='left', padx=5)
+
+    similar_row = ttk.Frame(frame)
+    similar_row.pack(fill='x')
+    ttk.Checkbutton(similar_row, text="Near Duplicates", 
+                   variable=app.near_duplicates).pack(side='left', padx=5)
+    ttk.Label(similar_row, text="Similarity:").pack(side='left')
+    ttk.Spinbox(similar_row, from_=0.1, to=1.0, increment=0.05, width=6,
+               textvariable=app.similarity_threshold).pack(side='left', padx=5)
     return frame
 
 def create_filter_frame(app):
@@ -98,7 +149,7 @@ def create_tree_frame(app):
     frame.pack(fill='both', expand=True, padx=5, pady=5)
 
     # Create treeview
-    tree = ttk.Treeview(frame, columns=('select', 'name', 'path', 'size', 'date'), 
+    tree = ttk.Treeview(frame, columns=('select', 'name', 'path', 'size', 'date', 'keeper', 'status'), 
                         show='headings')
     
     # Add scrollbars
@@ -117,7 +168,7 @@ def create_tree_frame(app):
 
     # Configure columns and headings
     tree.heading('select', text='Select')
-    for col in ('name', 'path', 'size', 'date'):
+    for col in ('name', 'path', 'size', 'date', 'keeper', 'status'):
         tree.heading(col, text=col.title(),
                     command=lambda c=col: app.file_handler.sort_treeview(c))
 
@@ -126,6 +177,8 @@ def create_tree_frame(app):
     tree.column('path', width=300)
     tree.column('size', width=100)
     tree.column('date', width=150)
+    tree.column('keeper', width=300)
+    tree.column('status', width=80)
 
     # Configure checkbox images
     tree.tag_configure('checked', image=create_checkbox(True))
@@ -151,5 +204,13 @@ def create_button_frame(app):
                    variable=app.move_to_trash).pack(side='left', padx=5)
     ttk.Button(frame, text="Delete Selected", 
               command=app.file_handler.delete_selected).pack(side='left', padx=5)
+    ttk.Combobox(frame, textvariable=app.link_method, values=('hardlink', 'reflink'),
+                 state='readonly', width=8).pack(side='left', padx=5)
+    ttk.Button(frame, text="Link Selected", 
+              command=app.file_handler.consolidate_selected).pack(side='left', padx=5)
+    ttk.Button(frame, text="Load Results", 
+              command=app.file_handler.load_results).pack(side='right', padx=5)
+    ttk.Button(frame, text="Save Results", 
+              command=app.file_handler.save_results).pack(side='right', padx=5)
     
     return frame
@@ -0,0 +1,57 @@
+import hashlib
+import io
+import os
+import tarfile
+import zipfile
+from datetime import datetime
+
+from core import archives, engine
+from core.engine import ScanConfig
+
+
+def _archive_info(path):
+    return {'path': str(path), 'name': path.name}
+
+
+def _zip_with_zero_date(path, content):
+    info = zipfile.ZipInfo('inner/file.txt', date_time=(1980, 0, 0, 0, 0, 0))
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr(info, content)
+
+
+def test_zip_member_with_zero_date_gets_archive_date(tmp_path):
+    path = tmp_path / 'zero.zip'
+    _zip_with_zero_date(path, b'content')
+
+    members = archives.list_members(_archive_info(path))
+
+    assert [m['member'] for m in members] == ['inner/file.txt']
+    assert members[0]['date'] == datetime.fromtimestamp(os.stat(path).st_mtime)
+
+
+def test_scan_with_zero_dated_zip_matches_members(tmp_path):
+    _zip_with_zero_date(tmp_path / 'zero.zip', b'content')
+    (tmp_path / 'file.txt').write_bytes(b'content')
+
+    config = ScanConfig(roots=[str(tmp_path)], mode='single', scan_archives=True)
+    result = engine.search(config)
+
+    assert [sorted(f['path'] for f in group.files) for group in result.groups] == [
+        [str(tmp_path / 'file.txt'),
+         str(tmp_path / 'zero.zip') + archives.MEMBER_SEPARATOR + 'inner/file.txt']]
+
+
+def test_tar_member_stored_twice_is_listed_and_hashed_once_as_last_copy(tmp_path):
+    path = tmp_path / 'twice.tar'
+    with tarfile.open(path, 'w') as tf:
+        for content in (b'first copy', b'second, last copy'):
+            info = tarfile.TarInfo('same.txt')
+            info.size = len(content)
+            tf.addfile(info, io.BytesIO(content))
+
+    members = archives.list_members(_archive_info(path))
+    hashed = archives.hash_members(members)
+
+    assert len(members) == 1 and hashed == members
+    assert members[0]['size'] == len(b'second, last copy')
+    assert members[0]['hash'] == hashlib.md5(b'second, last copy').hexdigest()
@@ -0,0 +1,38 @@
+import json
+import os
+
+import pytest
+
+from core import consolidate
+from core.engine import DuplicateGroup
+from core.scanner import get_file_info
+
+
+def test_consolidate_and_rollback_restore_separate_copies(tmp_path):
+    for name in ('keep.txt', 'copy.txt'):
+        (tmp_path / name).write_text('same content')
+    os.chmod(tmp_path / 'copy.txt', 0o640)
+    keeper, copy = (get_file_info(str(tmp_path / name)) for name in ('keep.txt', 'copy.txt'))
+    journal = str(tmp_path / 'journal.jsonl')
+
+    linked, refused = consolidate.consolidate(
+        [copy], [DuplicateGroup(files=[keeper, copy], keeper=keeper)], journal)
+    assert (linked, refused) == ([copy], [])
+    assert os.path.samefile(keeper['path'], copy['path'])
+    entry = json.loads(open(journal).read())
+    assert (entry['uid'], entry['gid']) == (os.getuid(), os.getgid())
+
+    restored, failed = consolidate.rollback(journal)
+    assert (restored, failed) == ([copy['path']], [])
+    assert not os.path.samefile(keeper['path'], copy['path'])
+    assert os.stat(copy['path']).st_mode & 0o777 == 0o640
+    assert sorted(os.listdir(tmp_path)) == ['copy.txt', 'journal.jsonl', 'keep.txt']
+
+
+def test_rollback_rejects_entry_without_owner(tmp_path):
+    journal = tmp_path / 'journal.jsonl'
+    journal.write_text(json.dumps({'method': 'hardlink', 'source': 'a', 'target': 'b',
+                                   'mode': 0o644, 'atime': 0, 'mtime': 0}) + '\n')
+
+    with pytest.raises(ValueError, match='gid, uid'):
+        consolidate.rollback(str(journal))
@@ -0,0 +1,71 @@
+import os
+import stat
+import threading
+
+import pytest
+
+from core.client import DaemonClient, DaemonError
+from core.daemon import Daemon
+from core.engine import ScanConfig
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    service = Daemon(str(tmp_path / 'daemon.sock'))
+    thread = threading.Thread(target=service.serve_forever, daemon=True)
+    thread.start()
+    client = DaemonClient(service.socket_path, timeout=10)
+    for _ in range(100):
+        try:
+            client.ping()
+            break
+        except DaemonError:
+            threading.Event().wait(0.05)
+    yield service, client
+    service.server.shutdown()
+    thread.join(10)
+
+
+def _tree(tmp_path):
+    for name in ('a', 'b'):
+        (tmp_path / 'd' / 'sub').mkdir(parents=True, exist_ok=True)
+        (tmp_path / 'd' / f'{name}.txt').write_text('same')
+    return tmp_path / 'd'
+
+
+def test_socket_is_private(daemon):
+    service, _ = daemon
+    assert stat.S_IMODE(os.stat(service.socket_path).st_mode) == 0o600
+
+
+def test_relative_paths_resolved_by_the_client(daemon, tmp_path, monkeypatch):
+    service, client = daemon
+    root = _tree(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    received = []
+    handle = service.handle
+    monkeypatch.setattr(service, 'handle', lambda request: received.append(request) or
+                        handle(request))
+
+    result = client.scan(ScanConfig(roots=['d'], mode='single', match_name=False))
+    assert len(result.groups) == 1
+    assert len(client.query(os.path.join('d', 'b.txt'))) == 1
+    (root / 'sub' / 'c.txt').write_text('new')
+    assert client.revalidate([os.path.join('d', 'sub')]) == 1
+
+    # The daemon may run in another directory: only absolute paths are sent
+    assert [request['config']['roots'] for request in received[:1]] == [[str(root)]]
+    assert received[1]['path'] == str(root / 'b.txt')
+    assert received[2]['paths'] == [str(root / 'sub')]
+
+
+def test_failure_returned_as_error_reply(daemon, monkeypatch):
+    service, client = daemon
+
+    def fail(request):
+        raise RuntimeError("unexpected")
+
+    monkeypatch.setitem(service._operations, 'status', fail)
+    with pytest.raises(DaemonError, match="unexpected"):
+        client.status()
+    assert client.ping()
@@ -0,0 +1,111 @@
+import os
+
+from core import async_scanner, engine, scanner
+from core.engine import ScanConfig
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return path
+
+
+def _sync(root, **options):
+    return scanner.scan_directory(str(root), **options)
+
+
+def _async(root, **options):
+    return async_scanner.scan_directory(str(root), concurrency=8, **options)
+
+
+def _comparable(files):
+    return [(f['path'], f['name'], f['size'], f['date'], f['inode']) for f in files]
+
+
+def test_hardlinked_file_kept_under_the_same_path_by_both_scanners(tmp_path):
+    original = _write(tmp_path / 'a' / 'zz.txt', 'linked')
+    (tmp_path / 'a' / 'b').mkdir()
+    os.link(original, tmp_path / 'a' / 'b' / 'x.txt')
+    os.link(original, tmp_path / 'a' / 'b.txt')
+    _write(tmp_path / 'a' / 'other.txt', 'other')
+
+    sync_files = _sync(tmp_path)
+    assert _comparable(_async(tmp_path)) == _comparable(sync_files)
+    linked = [f['path'] for f in sync_files if f['size'] == len('linked')]
+    assert linked == [str(tmp_path / 'a' / 'b' / 'x.txt')]
+
+
+def test_followed_symlinked_directory_walked_under_its_first_path(tmp_path):
+    _write(tmp_path / 'z' / 'real' / 'f.txt', 'data')
+    os.symlink(tmp_path / 'z' / 'real', tmp_path / 'a-link')
+
+    sync_files = _sync(tmp_path, follow_symlinks=True)
+    assert _comparable(_async(tmp_path, follow_symlinks=True)) == _comparable(sync_files)
+    assert [f['path'] for f in sync_files] == [str(tmp_path / 'a-link' / 'f.txt')]
+
+
+def test_followed_symlink_to_outside_file_keeps_path_inside_root(tmp_path):
+    outside = _write(tmp_path / 'outside' / 'target.txt', 'data')
+    root = tmp_path / 'root'
+    _write(root / 'sub' / 'copy.txt', 'data')
+    os.symlink(outside, root / 'sub' / 'link.txt')
+
+    for files in (_sync(root, follow_symlinks=True), _async(root, follow_symlinks=True)):
+        assert sorted(f['path'] for f in files) == [str(root / 'sub' / 'copy.txt'),
+                                                    str(root / 'sub' / 'link.txt')]
+
+
+def test_directories_with_followed_symlink_to_outside_file(tmp_path):
+    outside = _write(tmp_path / 'outside' / 'target.txt', 'data')
+    root = tmp_path / 'root'
+    for name in ('one', 'two'):
+        _write(root / name / 'a.txt', 'same')
+    os.symlink(outside, root / 'one' / 'link.txt')
+    _write(root / 'two' / 'link.txt', 'data')
+
+    config = ScanConfig(roots=[str(root)], mode='single', match_name=False,
+                        match_directories=True, follow_symlinks=True)
+    result = engine.search(config)
+
+    assert [sorted(f['path'] for f in group.files) for group in result.groups] == \
+        [[str(root / 'one'), str(root / 'two')]]
+
+
+def _plain_tree(root):
+    _write(root / 'top.txt', 'same')
+    _write(root / 'b.txt', 'other')
+    _write(root / 'b' / 'same.txt', 'same')
+    _write(root / 'b' / 'c' / 'deep.txt', 'same')
+    _write(root / 'b' / 'c' / 'unique.txt', 'unique')
+    _write(root / 'empty.txt', '')
+    (root / 'empty-dir').mkdir()
+
+
+def test_scanners_list_the_same_files_on_a_plain_tree(tmp_path):
+    _plain_tree(tmp_path)
+
+    for recursive in (True, False):
+        sync_files = _sync(tmp_path, recursive=recursive)
+        assert _comparable(_async(tmp_path, recursive=recursive)) == _comparable(sync_files)
+    assert len(_sync(tmp_path)) == 6
+
+
+def _groups(result):
+    return [sorted(f['path'] for f in group.files) for group in result.groups]
+
+
+def test_async_and_sync_searches_give_the_same_groups(tmp_path):
+    _plain_tree(tmp_path)
+    os.link(tmp_path / 'b' / 'c' / 'unique.txt', tmp_path / 'a-link.txt')
+    os.link(tmp_path / 'top.txt', tmp_path / 'b' / 'c' / 'top.txt')
+    _write(tmp_path / 'b' / 'c' / 'b.txt', 'other')
+
+    for mode, roots in (('single', [tmp_path]), ('multi', [tmp_path / 'b', tmp_path])):
+        for match_name in (True, False):
+            configs = [ScanConfig(roots=[str(root) for root in roots], mode=mode,
+                                  match_name=match_name, async_scan=async_scan)
+                       for async_scan in (False, True)]
+            sync_result, async_result = (engine.search(config) for config in configs)
+            assert _groups(async_result) == _groups(sync_result)
+            assert sync_result.groups
+            assert async_result.files_scanned == sync_result.files_scanned